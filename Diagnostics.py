@@ -0,0 +1,35 @@
+import pandas as pd
+import streamlit as st
+
+import profiling
+
+# 計測結果（profiling.py）の確認ページ
+st.set_page_config(page_title="診断（再実行の内訳）", page_icon="🩺", layout="wide")
+st.title("🩺 診断：どこで時間がかかっているか")
+
+if not profiling.ENABLED:
+    st.info("計測は無効です。環境変数 LAZY_APP_PROFILING=1 を付けて起動すると記録されます。")
+
+HOURS = {"直近1時間": 1, "直近24時間": 24, "直近7日": 24 * 7}
+window = st.radio("期間", list(HOURS), index=1, horizontal=True)
+since = HOURS[window] * 60 * 60
+
+# ページごとに上位を取る（他のページの遅いスパンに押し出されないように）
+spans = pd.DataFrame(
+    profiling.span_summary(since_seconds=since, limit=20),
+    columns=["page", "span", "calls", "p50_ms", "p95_ms", "max_ms"],
+)
+if spans.empty:
+    st.write("この期間の記録はありません。")
+else:
+    st.subheader("遅いスパン（ページごとに p95 の遅い順）")
+    pages = ["すべて"] + sorted(spans["page"].unique())
+    page = st.selectbox("ページ", pages)
+    if page != "すべて":
+        spans = spans[spans["page"] == page]
+    st.dataframe(spans.round(2), use_container_width=True, hide_index=True)
+
+counters = pd.DataFrame(profiling.counter_summary(since_seconds=since), columns=["page", "counter", "total"])
+if not counters.empty:
+    st.subheader("カウンター")
+    st.dataframe(counters, use_container_width=True, hide_index=True)
@@ -1,102 +1,96 @@
 import streamlit as st
-from openai import OpenAI
-import sqlite3
 
-# OpenAIクライアントの初期化
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+from llm_cache import get_llm_cache
+from profiling import span
+from task_llm import MODEL, SPLIT_TEMPERATURE, get_client, split_prompt, stream_split, submit_praise
+from task_store import (
+    SEARCH_LIMIT,
+    TASKS_DB_PATH,
+    TASKS_PER_PAGE,
+    count_tasks,
+    init_db,
+    load_task_page,
+    save_split,
+    search_tasks,
+    set_subtasks_done,
+)
 
-# SQLiteデータベースに接続し、カーソルを取得
-conn = sqlite3.connect("tasks.db")
-cursor = conn.cursor()
+rerun_span = span("Split.rerun")
 
 # テーブル作成（初回のみ）
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS tasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS subtasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    parent_id INTEGER,
-    content TEXT NOT NULL,
-    estimated_time TEXT,
-    is_done BOOLEAN DEFAULT 0,
-    FOREIGN KEY (parent_id) REFERENCES tasks(id)
-)
-""")
+init_db()
+
+# LLM応答キャッシュ（同じ・ほぼ同じタスクの分割は API を呼ばずに返す）
+LLM_CACHE = get_llm_cache(TASKS_DB_PATH)
 
 # Streamlit UI
 st.title("🚀 タスク分割 & 称賛ページ")
+with st.sidebar:
+    bypass_cache = st.toggle("キャッシュを使わずに生成する", value=False)
+    cache_stats = LLM_CACHE.stats()
+    st.caption(f"LLMキャッシュ：ヒット {cache_stats['hits']} / ミス {cache_stats['misses']}")
 task = st.text_area("やることを入力してください")
 
 if st.button("分割する", key="split_button") and task.strip():
-    # GPTで分割
-    prompt = f"""
-あなたは優秀なタスク分割アシスタントです。
-以下の作業を、ポモドーロ（25分）単位で取り組めるように、3〜5ステップに分けてください。
-各ステップは、1ポモドーロ（25分）で完了できるように調整してください。
-やること: {task}
-"""
-    response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7
-    )
-    split_result = response.choices[0].message.content
-
-    # 称賛メッセージ生成
-    praise_prompt = f"""
-あなたはモチベーションを高める称賛メッセージの専門家です。
-以下の作業を終えた人に、短くて心に響く称賛メッセージを1つください。
-作業: {task}
-"""
-    praise_response = client.chat.completions.create(
-        model="gpt-4",
-        messages=[{"role": "user", "content": praise_prompt}],
-        temperature=0.9
-    )
-    praise_result = praise_response.choices[0].message.content
-
-    # 表示
+    # OpenAIクライアントは初めて使うときに作る（プロセスで使い回す）
+    client = get_client(st.secrets["OPENAI_API_KEY"])
+
+    # 称賛メッセージは裏で並行生成し、その間に分割結果をストリーミング表示
+    praise_future = submit_praise(client, task, None if bypass_cache else LLM_CACHE)
+
     st.markdown("### 💬 称賛メッセージ")
-    st.success(praise_result)
-    st.balloons()
+    praise_box = st.empty()
+    praise_box.info("称賛メッセージを準備中…")
 
     st.markdown("### 🔹 分割されたタスク")
-    st.write(split_result)
+    prompt = split_prompt(task)
+    split_result = None if bypass_cache else LLM_CACHE.get(MODEL, SPLIT_TEMPERATURE, prompt)
+    if split_result is not None:
+        st.write(split_result)
+    else:
+        split_result = st.write_stream(stream_split(client, task))
+        # キャッシュを使わなかったときも結果は保存して次回に使う
+        LLM_CACHE.put(MODEL, SPLIT_TEMPERATURE, prompt, split_result)
 
-    # DB保存（親タスク）
-    cursor.execute("INSERT INTO tasks (title) VALUES (?)", (task,))
-    parent_id = cursor.lastrowid
-    conn.commit()
+    praise_box.success(praise_future.result())
+    st.balloons()
 
-    # ✅ 子タスク保存（重複除外付き）
-    lines = split_result.strip().split("\n")
-    for line in lines:
-        clean_line = line.strip()
-        if clean_line and clean_line != task:
-            cursor.execute(
-                "INSERT INTO subtasks (parent_id, content, estimated_time) VALUES (?, ?, ?)",
-                (parent_id, clean_line, "25分")
-            )
-    conn.commit()
+    # DB保存（親タスク＋子タスクを1トランザクションで）
+    save_split(task, split_result)
 
+# 🔽 保存されたタスク一覧を表示（チェック付き）。表示中のページ分だけ読み込む
+if "task_page" not in st.session_state:
+    st.session_state.task_page = 0
 
+def _move_task_page(step):
+    st.session_state.task_page = max(0, st.session_state.task_page + step)
 
-# 🔽 保存されたタスク一覧を表示（チェック付き）
-cursor.execute("SELECT id, title FROM tasks ORDER BY created_at DESC")
-tasks = cursor.fetchall()
+# 検索語があれば一致するタスクだけを関連度順に表示（全文検索の索引を使う）
+search = st.text_input("🔍 タスクを検索", key="task_search",
+                       placeholder="空白区切りの語をすべて含むものを検索（部分一致）").strip()
+if search:
+    tree = search_tasks(search)
+    st.caption(f"「{search}」に一致するタスク：{len(tree)} 件" + ("（上位のみ表示）" if len(tree) >= SEARCH_LIMIT else ""))
+else:
+    total_tasks = count_tasks()
+    last_page = max(0, (total_tasks - 1) // TASKS_PER_PAGE)
+    st.session_state.task_page = min(st.session_state.task_page, last_page)
+    tree = load_task_page(st.session_state.task_page)
 
-for task_id, title in tasks:
+# チェックの変更は描画中に集めて、最後に1回だけ書き込む
+pending_done = []
+for task_id, title, subtasks in tree:
     st.markdown(f"### 🧩 {title}")
-    cursor.execute("SELECT id, content, is_done FROM subtasks WHERE parent_id = ?", (task_id,))
-    subtasks = cursor.fetchall()
     for subtask_id, content, is_done in subtasks:
         checked = st.checkbox(content, value=bool(is_done), key=f"{subtask_id}")
         if checked != bool(is_done):
-            cursor.execute("UPDATE subtasks SET is_done = ? WHERE id = ?", (int(checked), subtask_id))
-            conn.commit()
\ No newline at end of file
+            pending_done.append((subtask_id, checked))
+set_subtasks_done(pending_done)
+
+if not search and total_tasks > TASKS_PER_PAGE:
+    p1, p2, p3 = st.columns([1, 2, 1])
+    p1.button("← 新しい", disabled=st.session_state.task_page == 0, on_click=_move_task_page, args=(-1,))
+    p2.caption(f"{st.session_state.task_page + 1} / {last_page + 1} ページ（全 {total_tasks} 件）")
+    p3.button("古い →", disabled=st.session_state.task_page >= last_page, on_click=_move_task_page, args=(1,))
+
+rerun_span.stop()
@@ -1,10 +1,14 @@
 # main.py
 # Matplotlibを使わず、CSSのconic-gradientで時計回りドーナツを描画
 import time
-import os
 import streamlit as st
 
+from audio_library import get_library
+from profiling import count, span
+from session_logger import get_session_logger
+
 st.set_page_config(page_title="ポモドーロ", page_icon="⏳")
+rerun_span = span("Start.rerun")
 st.title("⏳ ポモドーロ・タイマー（CSSドーナツ／1秒更新＋BGM）")
 
 # 1) 作業時間（25/15/5）
@@ -25,11 +29,16 @@ bgm_mode = st.radio(
 )
 bgm_obj = None
 if bgm_mode == "フォルダのMP3から選ぶ":
-    mp3s = [f for f in os.listdir(".") if f.lower().endswith(".mp3")]
+    # 一覧・中身ともにキャッシュ（フォルダが変わらない限りディスクを読まない）
+    library = get_library(".")
+    mp3s = library.tracks()
     if mp3s:
         pick = st.selectbox("MP3ファイルを選択", mp3s)
         if pick:
-            bgm_obj = pick
+            try:
+                bgm_obj = library.read(pick)
+            except FileNotFoundError:
+                st.warning(f"{pick} が見つかりません。")
     else:
         st.info("このフォルダに .mp3 が見つかりません。")
 elif bgm_mode == "MP3をアップロードする":
@@ -37,7 +46,7 @@ elif bgm_mode == "MP3をアップロードする":
     if up is not None:
         bgm_obj = up
 if bgm_obj:
-    st.audio(bgm_obj)
+    st.audio(bgm_obj, format="audio/mpeg")
 
 # 3) 状態（記憶）
 if "running" not in st.session_state:
@@ -48,9 +57,32 @@ if "target_end" not in st.session_state:
     st.session_state.target_end = time.time() + st.session_state.remaining
 if "last_minutes" not in st.session_state:
     st.session_state.last_minutes = minutes
+if "log_key" not in st.session_state:
+    st.session_state.log_key = None  # 記録中のタイマーのキー（SessionLogger）
+
+# 学習記録（study.db の sessions。書き込みは裏のスレッドがまとめて行うので描画は待たない）
+with st.sidebar:
+    log_enabled = st.toggle("学習記録に残す（Stats に反映）", value=True)
+
+def log_event(event, focus_seconds=None):
+    # 新しく始めるタイマーだけ記録オン／オフに従う。記録中のものは最後まで記録する
+    if event == "start":
+        if not log_enabled:
+            return
+        st.session_state.log_key = get_session_logger().new_key()
+    key = st.session_state.log_key
+    if key is None:
+        return
+    if focus_seconds is None:
+        focus_seconds = total_sec - st.session_state.remaining
+    get_session_logger().log(event, key, focus_seconds)
+    if event == "finish":
+        st.session_state.log_key = None
 
 # 分数変更時はリセット
 if minutes != st.session_state.last_minutes:
+    # 途中までの集中時間は元の作業時間で計算して記録を閉じる
+    log_event("finish", st.session_state.last_minutes * 60 - st.session_state.remaining)
     st.session_state.last_minutes = minutes
     st.session_state.running = False
     st.session_state.remaining = total_sec
@@ -66,21 +98,35 @@ reset = c3.button("⏹ リセット")
 if start:
     st.session_state.running = True
     st.session_state.target_end = time.time() + st.session_state.remaining
+    if st.session_state.remaining > 0:
+        log_event("resume" if st.session_state.log_key else "start")
 
 if pause:
     now = time.time()
     st.session_state.remaining = max(0, int(st.session_state.target_end - now))
     st.session_state.running = False
+    log_event("pause")
 
 if reset:
+    log_event("finish")
     st.session_state.running = False
     st.session_state.remaining = total_sec
     st.session_state.target_end = time.time() + total_sec
 
-# 5) 残り秒を更新（動作中のみ）
-if st.session_state.running:
+# 5) 残り秒を更新（動作中のみ）。0秒になったら停止して終了表示を予約
+#    呼ぶのは countdown() だけ（全体の再実行でもフラグメントは1回だけ実行される）
+def tick() -> bool:
+    if not st.session_state.running:
+        return False
     now = time.time()
     st.session_state.remaining = max(0, int(st.session_state.target_end - now))
+    if st.session_state.remaining <= 0:
+        st.session_state.running = False
+        st.session_state.just_finished = True
+        log_event("finish")
+        return True
+    log_event("progress")
+    return False
 
 # 6) CSSドーナツ（時計回り／12時起点）
 def donut_html(done_ratio: float) -> str:
@@ -108,21 +154,26 @@ def donut_html(done_ratio: float) -> str:
     </div>
     """
 
-# 7) 表示
-rem = st.session_state.remaining
-done_ratio = 1 - (rem / total_sec)
-m, s = divmod(rem, 60)
-st.subheader(f"残り：{int(m)}分 {int(s)}秒")
+# 7) 表示（動作中はこのフラグメントだけを1秒ごとに再実行。sleep でスレッドを塞がない）
+@st.fragment(run_every=1 if st.session_state.running else None)
+def countdown():
+    count("Start.tick")
+    if tick():
+        # 終了時だけページ全体を再実行して、ボタン等の状態と終了表示を反映
+        st.rerun()
+    rem = st.session_state.remaining
+    done_ratio = 1 - (rem / total_sec)
+    m, s = divmod(rem, 60)
+    st.subheader(f"残り：{int(m)}分 {int(s)}秒")
+
+    ph = st.empty()
+    ph.markdown(donut_html(done_ratio), unsafe_allow_html=True)
 
-ph = st.empty()
-ph.markdown(donut_html(done_ratio), unsafe_allow_html=True)
+countdown()
 
-# 終了 or 1秒ごと再描画
-if st.session_state.running:
-    if st.session_state.remaining <= 0:
-        st.session_state.running = False
-        st.balloons()
-        st.success("お疲れさまでした！")
-    else:
-        time.sleep(1)
-        st.rerun()
+# 終了表示
+if st.session_state.pop("just_finished", False):
+    st.balloons()
+    st.success("お疲れさまでした！")
+
+rerun_span.stop()
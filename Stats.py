@@ -1,127 +1,183 @@
-import os
-import sqlite3
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-import pandas as pd
+import numpy as np
 import streamlit as st
 
-# =========================
-# 基本設定
-# =========================
-APP_TZ = ZoneInfo("Asia/Tokyo")
-DB_DIR = os.path.join(".", "data")
-DB_PATH = os.path.join(DB_DIR, "study.db")
-
-os.makedirs(DB_DIR, exist_ok=True)
+from profiling import span, timed
+from session_archive import (
+    ARCHIVE_HORIZON_DAYS,
+    archive_available,
+    archive_page,
+    archive_sessions,
+    archived_months,
+    export_sessions,
+)
+from study_metrics import APP_TZ, compute_metrics
+from study_store import (
+    STATS_CACHE,
+    finish_session,
+    get_conn,
+    init_db,
+    insert_session_start,
+    read_snapshot,
+    rebuild_daily_rollup,
+)
 
 # =========================
-# DBユーティリティ
+# 読み込み（スキーマと書き込みは study_store.py）
 # =========================
-def get_conn():
-    # check_same_thread=False で Streamlit の複数スレッドでも安全に
-    return sqlite3.connect(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
-
-def init_db():
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id     INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id        INTEGER NOT NULL DEFAULT 1,
-            started_at_utc TEXT NOT NULL,
-            finished_at_utc TEXT,
-            focus_seconds  INTEGER NOT NULL DEFAULT 0,
-            note           TEXT
-        );
-        """)
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_started ON sessions(user_id, started_at_utc);")
-        conn.commit()
-
-def insert_session_start(user_id: int, started_at_utc: datetime):
+HISTORY_PAGE_SIZE = 20
+
+def _local_day_start_utc(d) -> str:
+    # ローカル日付の0時をUTCのISO文字列に（started_at_utc と文字列比較するため）
+    return datetime(d.year, d.month, d.day, tzinfo=APP_TZ).astimezone(ZoneInfo("UTC")).isoformat()
+
+@timed("Stats.load_sessions_page")
+def load_sessions_page(user_id: int, anchor=None, direction: str = "older", limit: int = HISTORY_PAGE_SIZE,
+                       date_from=None, date_to=None):
+    """(started_at_utc, session_id) をキーにしたキーセットページング。
+
+    anchor より古い（direction="older"）／新しい（"newer"）行を新しい順に最大 limit 件返す。
+    戻り値は (rows, has_more)。has_more は direction 方向にまだ行が残っているか。
+    """
+    where = ["user_id = ?"]
+    params = [user_id]
+    start_utc = _local_day_start_utc(date_from) if date_from is not None else None
+    end_utc = _local_day_start_utc(date_to + timedelta(days=1)) if date_to is not None else None
+    if start_utc is not None:
+        where.append("started_at_utc >= ?")
+        params.append(start_utc)
+    if end_utc is not None:
+        where.append("started_at_utc < ?")
+        params.append(end_utc)
+    if anchor is not None:
+        where.append(f"(started_at_utc, session_id) {'<' if direction == 'older' else '>'} (?, ?)")
+        params.extend(anchor)
+    order = "DESC" if direction == "older" else "ASC"
+    params.append(limit + 1)
+    # sessions とアーカイブの一覧は同じ時点で読む（間にアーカイブされても重複・欠落しない）
+    with read_snapshot() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT session_id, started_at_utc, finished_at_utc, focus_seconds, note
+            FROM sessions
+            WHERE {' AND '.join(where)}
+            ORDER BY started_at_utc {order}, session_id {order}
+            LIMIT ?
+            """,
+            params,
+        ).fetchall()
+        if archived_months():
+            # 古い行はアーカイブにあるので、同じキーセットで取った分と合わせて並べ直す
+            rows += archive_page(user_id, anchor, direction, limit + 1, start_utc, end_utc)
+            rows.sort(key=lambda r: (r[1], r[0]), reverse=direction == "older")
+            rows = rows[:limit + 1]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "newer":
+        rows.reverse()
+    return rows, has_more
+
+@timed("Stats.load_daily_rollup")
+def load_daily_rollup(user_id: int) -> dict:
+    """日次集計を列ごとの numpy 配列で返す（pandas を読み込まずに指標を出すため）"""
     with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO sessions (user_id, started_at_utc) VALUES (?, ?)",
-            (user_id, started_at_utc.isoformat()),
-        )
-        conn.commit()
-        return cur.lastrowid
-
-def finish_session(session_id: int, finished_at_utc: datetime, focus_seconds: int):
-    with get_conn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE sessions SET finished_at_utc = ?, focus_seconds = ? WHERE session_id = ?",
-            (finished_at_utc.isoformat(), max(0, int(focus_seconds)), session_id),
-        )
-        conn.commit()
-
-def load_all_sessions(user_id: int) -> pd.DataFrame:
+        rows = conn.execute(
+            "SELECT local_date, focus_seconds, session_count FROM daily_rollup WHERE user_id = ? ORDER BY local_date ASC",
+            (user_id,),
+        ).fetchall()
+    local_dates, focus_seconds, session_counts = zip(*rows) if rows else ((), (), ())
+    return {
+        "local_date": np.array(local_dates, dtype="datetime64[D]"),
+        "focus_seconds": np.array(focus_seconds, dtype=np.int64),
+        "session_count": np.array(session_counts, dtype=np.int64),
+    }
+
+def load_metrics(user_id: int):
+    """日次集計から指標を出す（変更が無ければキャッシュ）"""
+    return STATS_CACHE.get(user_id, "metrics", lambda: compute_metrics(load_daily_rollup(user_id)))
+
+# グラフの粒度。daily_rollup.local_date（Asia/Tokyo の日付）を SQLite 側で丸める
+CHART_BUCKETS = {
+    "日": "local_date",
+    "週": "date(local_date, '-' || ((CAST(strftime('%w', local_date) AS INTEGER) + 6) % 7) || ' days')",  # 月曜始まり
+    "月": "strftime('%Y-%m-01', local_date)",
+    "年": "strftime('%Y-01-01', local_date)",
+}
+CHART_BUCKET_DAYS = {"日": 1, "週": 7, "月": 31, "年": 366}
+MAX_CHART_POINTS = 60  # 期間が長くてもこの本数に収まる粒度を選ぶ
+
+def chart_resolution(date_from, date_to) -> str:
+    days = (date_to - date_from).days + 1
+    return next(
+        (unit for unit, width in CHART_BUCKET_DAYS.items() if days <= width * MAX_CHART_POINTS),
+        "年",
+    )
+
+@timed("Stats.load_chart_buckets")
+def _read_chart_buckets(user_id: int, unit: str, date_from, date_to) -> dict:
+    bucket = CHART_BUCKETS[unit]
     with get_conn() as conn:
-        df = pd.read_sql_query(
-            "SELECT * FROM sessions WHERE user_id = ? ORDER BY started_at_utc ASC",
-            conn,
-            params=(user_id,),
-        )
-    # 文字列→datetime
-    if not df.empty:
-        df["started_at_utc"] = pd.to_datetime(df["started_at_utc"], utc=True)
-        df["finished_at_utc"] = pd.to_datetime(df["finished_at_utc"], utc=True, errors="coerce")
-    return df
+        rows = conn.execute(
+            f"""
+            SELECT {bucket} AS bucket, SUM(focus_seconds)
+            FROM daily_rollup
+            WHERE user_id = ? AND local_date BETWEEN ? AND ?
+            GROUP BY bucket
+            ORDER BY bucket
+            """,
+            (user_id, date_from.isoformat(), date_to.isoformat()),
+        ).fetchall()
+    buckets, focus_seconds = zip(*rows) if rows else ((), ())
+    return {
+        "bucket": np.array(buckets, dtype="datetime64[D]"),
+        "focus_seconds": np.array(focus_seconds, dtype=np.int64),
+    }
+
+def load_chart_buckets(user_id: int, date_from=None, date_to=None):
+    """期間内の学習時間を日／週／月／年ごとに集計して (粒度, 列ごとの配列) を返す。
+
+    date_from が None なら記録の最初の日から。点の数は MAX_CHART_POINTS 程度に収まる。
+    """
+    date_to = date_to or datetime.now(APP_TZ).date()
+    if date_from is None:
+        with get_conn() as conn:
+            first = conn.execute("SELECT MIN(local_date) FROM daily_rollup WHERE user_id = ?", (user_id,)).fetchone()[0]
+        date_from = datetime.fromisoformat(first).date() if first else date_to
+    unit = chart_resolution(date_from, date_to)
+    return unit, STATS_CACHE.get(
+        user_id, ("chart", unit, date_from, date_to), lambda: _read_chart_buckets(user_id, unit, date_from, date_to)
+    )
+
+def load_history_view(user_id: int, anchor=None, direction: str = "older", date_from=None, date_to=None):
+    """履歴1ページ分の (rows, has_more, 表示用の行)（変更が無ければキャッシュ）"""
+    def build():
+        rows, has_more = load_sessions_page(user_id, anchor, direction, date_from=date_from, date_to=date_to)
+        show = [
+            {
+                "session_id": session_id,
+                "started_local": fmt_local(started),
+                "finished_local": fmt_local(finished),
+                "focus_time": fmt_hms(int(focus_seconds or 0)),
+                "note": note_text,
+            }
+            for session_id, started, finished, focus_seconds, note_text in rows
+        ]
+        return rows, has_more, show
+
+    return STATS_CACHE.get(user_id, ("history", direction, anchor, date_from, date_to), build)
 
 # =========================
-# 指標計算（Asia/Tokyoでの日付を基準）
+# 表示ユーティリティ
 # =========================
-def _to_local(dt_utc: pd.Timestamp) -> pd.Timestamp:
-    return dt_utc.tz_convert(APP_TZ)
-
-def compute_metrics(df: pd.DataFrame):
-    if df.empty:
-        return {
-            "total_seconds": 0,
-            "last7_seconds": 0,
-            "streak_days": 0,
-            "by_day": pd.DataFrame(),
-        }
-
-    # ローカルタイムに変換
-    df = df.copy()
-    df["started_local"] = df["started_at_utc"].dt.tz_convert(APP_TZ)
-    df["finished_local"] = df["finished_at_utc"].dt.tz_convert(APP_TZ)
-
-    # 学習秒数は focus_seconds（未終了は0のまま）
-    df["focus_seconds"] = df["focus_seconds"].fillna(0).astype(int)
-
-    # 日単位の集計（ローカル日付）
-    df["local_date"] = df["started_local"].dt.date
-    by_day = df.groupby("local_date", as_index=False)["focus_seconds"].sum()
-
-    # 総学習時間
-    total_seconds = int(by_day["focus_seconds"].sum())
-
-    # 直近7日（今日含む）の学習時間
-    today_local = datetime.now(APP_TZ).date()
-    seven_days_ago = today_local - timedelta(days=6)
-    last7 = by_day[(by_day["local_date"] >= seven_days_ago) & (by_day["local_date"] <= today_local)]
-    last7_seconds = int(last7["focus_seconds"].sum())
-
-    # 連続日数（今日も学習していれば今日から、していなければ昨日から）
-    learned_days = set(by_day[by_day["focus_seconds"] > 0]["local_date"].tolist())
-    # 連続の起点は「今日 or 昨日」。今日に学習がなければ昨日から数える
-    start_date = today_local if today_local in learned_days else (today_local - timedelta(days=1))
-    streak = 0
-    cur = start_date
-    while cur in learned_days:
-        streak += 1
-        cur = cur - timedelta(days=1)
+def _to_local(dt_utc: datetime) -> datetime:
+    return dt_utc.astimezone(APP_TZ)
 
-    return {
-        "total_seconds": total_seconds,
-        "last7_seconds": last7_seconds,
-        "streak_days": streak,
-        "by_day": by_day.sort_values("local_date"),
-    }
+def fmt_local(ts_utc) -> str:
+    if not ts_utc:
+        return ""
+    return datetime.fromisoformat(ts_utc).astimezone(APP_TZ).strftime("%Y-%m-%d %H:%M:%S")
 
 def fmt_hms(total_seconds: int) -> str:
     h = total_seconds // 3600
@@ -137,6 +193,7 @@ def fmt_hms(total_seconds: int) -> str:
 # =========================
 # Streamlit UI
 # =========================
+rerun_span = span("Stats.rerun")
 st.set_page_config(page_title="学習ポモドーロ（記録＆指標）", page_icon="⏱️", layout="centered")
 st.title("⏱️ 学習ポモドーロ（記録＆指標）")
 
@@ -151,17 +208,41 @@ if "active_session_id" not in st.session_state:
 if "started_at_utc" not in st.session_state:
     st.session_state.started_at_utc = None
 
+# 履歴ページング（(向き, (started_at_utc, session_id))。None は最新ページ）
+if "history_anchor" not in st.session_state:
+    st.session_state.history_anchor = None
+
 # ==== ステータス表示 ====
-df = load_all_sessions(USER_ID)
-metrics = compute_metrics(df)
+metrics = load_metrics(USER_ID)
 
 col1, col2, col3 = st.columns(3)
 col1.metric("連続日数", f"{metrics['streak_days']} 日")
 col2.metric("直近7日の学習", fmt_hms(metrics["last7_seconds"]))
 col3.metric("総学習時間", fmt_hms(metrics["total_seconds"]))
+col4, col5, _ = st.columns(3)
+col4.metric("最長連続日数", f"{metrics['longest_streak_days']} 日")
+col5.metric("直近30日の学習", fmt_hms(metrics["last30_seconds"]))
 
 st.caption("※ タイムゾーンは Asia/Tokyo で日付判定しています。")
 
+with st.sidebar:
+    st.caption("メンテナンス")
+    if st.button("日次集計を再構築"):
+        rebuild_daily_rollup()
+        metrics = load_metrics(USER_ID)
+        st.toast("日次集計を再構築しました。", icon="🔁")
+    if archive_available():
+        if st.button(f"{ARCHIVE_HORIZON_DAYS}日より前の記録をアーカイブ"):
+            moved = archive_sessions()
+            st.toast(f"{moved} 件を月別アーカイブへ移しました。", icon="🗄️")
+        if st.button("全記録の書き出しを準備"):
+            st.download_button(
+                "Parquet をダウンロード",
+                export_sessions(USER_ID),
+                file_name="study_sessions.parquet",
+                mime="application/vnd.apache.parquet",
+            )
+
 # ==== 操作パネル ====
 st.subheader("ポモドーロ操作")
 DEFAULT_FOCUS_MIN = 25
@@ -181,7 +262,7 @@ if submitted and st.session_state.active_session_id is None:
 
 # アクティブ中の表示と停止ボタン
 if st.session_state.active_session_id is not None:
-    started_local = _to_local(pd.Timestamp(st.session_state.started_at_utc))
+    started_local = _to_local(st.session_state.started_at_utc)
     elapsed = (datetime.now(tz=ZoneInfo("UTC")) - st.session_state.started_at_utc).total_seconds()
     st.info(f"進行中：{started_local.strftime('%Y-%m-%d %H:%M:%S')} 開始 / 経過 {fmt_hms(int(elapsed))}")
     if st.button("■ 終了（Finish）", type="primary"):
@@ -193,33 +274,69 @@ if st.session_state.active_session_id is not None:
             with get_conn() as conn:
                 conn.execute("UPDATE sessions SET note = ? WHERE session_id = ?", (note, st.session_state.active_session_id))
                 conn.commit()
+            STATS_CACHE.invalidate(USER_ID)
         st.session_state.active_session_id = None
         st.session_state.started_at_utc = None
         st.success("セッションを保存しました。おつかれさま！🎉")
         # 指標を更新
-        df = load_all_sessions(USER_ID)
-        metrics = compute_metrics(df)
+        metrics = load_metrics(USER_ID)
 
 st.divider()
 
 # ==== 履歴テーブル ====
+def _page_to(direction, key):
+    st.session_state.history_anchor = (direction, key)
+
+def _reset_history_page():
+    st.session_state.history_anchor = None
+
 st.subheader("学習履歴（直近）")
-if df.empty:
-    st.write("まだ記録がありません。上でセッションを開始してみましょう。")
+date_from = date_to = None
+if st.checkbox("期間で絞り込む", key="history_filter", on_change=_reset_history_page):
+    picked = st.date_input("期間（Asia/Tokyo）", value=(), key="history_range", on_change=_reset_history_page)
+    if len(picked) == 2:
+        date_from, date_to = picked
+
+anchor = st.session_state.history_anchor
+direction, key = anchor if anchor else ("older", None)
+rows, has_more, show = load_history_view(USER_ID, key, direction, date_from=date_from, date_to=date_to)
+if anchor is not None and (not rows or (direction == "newer" and not has_more)):
+    # 最新側の端に戻った／境界を越えた（データ削除など）ときは最新ページに戻す
+    st.session_state.history_anchor = None
+    direction, key = "older", None
+    rows, has_more, show = load_history_view(USER_ID, date_from=date_from, date_to=date_to)
+
+if not rows:
+    if date_from is None:
+        st.write("まだ記録がありません。上でセッションを開始してみましょう。")
+    else:
+        st.write("この期間の記録はありません。")
 else:
-    # 表示用にローカルタイムへ変換
-    show = df.copy()
-    show["started_local"] = show["started_at_utc"].dt.tz_convert(APP_TZ).dt.strftime("%Y-%m-%d %H:%M:%S")
-    show["finished_local"] = show["finished_at_utc"].dt.tz_convert(APP_TZ).dt.strftime("%Y-%m-%d %H:%M:%S")
-    show["focus_time"] = show["focus_seconds"].apply(fmt_hms)
-    show = show[["session_id", "started_local", "finished_local", "focus_time", "note"]].sort_values("session_id", ascending=False)
-    st.dataframe(show, use_container_width=True)
-
-# ==== 日次サマリ ====
-if not metrics["by_day"].empty:
-    st.subheader("日次サマリ")
-    day = metrics["by_day"].copy()
-    day["date"] = pd.to_datetime(day["local_date"])
-    day["hours"] = (day["focus_seconds"] / 3600).round(2)
-    st.bar_chart(day.set_index("date")["hours"])
-    st.caption("棒グラフ：各日の学習時間（時間）")
+    st.dataframe(show, use_container_width=True, hide_index=True)
+
+    has_newer = has_more if direction == "newer" else key is not None
+    has_older = has_more if direction == "older" else True
+    first_key = (rows[0][1], rows[0][0])
+    last_key = (rows[-1][1], rows[-1][0])
+    p1, _, p2 = st.columns([1, 2, 1])
+    p1.button("← 新しい", disabled=not has_newer, on_click=_page_to, args=("newer", first_key))
+    p2.button("古い →", disabled=not has_older, on_click=_page_to, args=("older", last_key))
+
+# ==== 学習時間サマリ ====
+CHART_RANGES = {"直近30日": 30, "直近90日": 90, "直近1年": 365, "全期間": None}
+
+if metrics["by_day"]["local_date"].size:
+    import pandas as pd  # グラフを描くときだけ読み込む
+
+    st.subheader("学習時間サマリ")
+    range_days = CHART_RANGES[st.radio("期間", list(CHART_RANGES), index=1, horizontal=True, key="chart_range")]
+    chart_to = datetime.now(APP_TZ).date()
+    chart_from = chart_to - timedelta(days=range_days - 1) if range_days else None
+    unit, buckets = load_chart_buckets(USER_ID, chart_from, chart_to)
+    hours = pd.Series(
+        (buckets["focus_seconds"] / 3600).round(2), index=pd.DatetimeIndex(buckets["bucket"], name="date")
+    )
+    st.bar_chart(hours.rename("hours"))
+    st.caption(f"棒グラフ：各{unit}の学習時間（時間）。期間の長さに合わせて日／週／月／年でまとめています。")
+
+rerun_span.stop()
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from profiling import count, timed
+from resources import shared_resource
+
+# =========================
+# BGM（MP3）ライブラリのインデックスとバイトキャッシュ
+# =========================
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024  # 64MB
+
+
+class AudioLibrary:
+    """フォルダ内の MP3 一覧とファイル内容をキャッシュする。
+
+    一覧はフォルダの mtime が変わったときだけ作り直す。
+    ファイル内容は内容ハッシュをキーに LRU で保持し、容量上限を超えたら古いものから捨てる。
+    上書き保存ではフォルダの mtime が変わらないので、読むときはファイル自体も stat して確かめる。
+    """
+
+    def __init__(self, directory=".", max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._dir_mtime = None
+        self._index = {}  # name -> {"path", "size", "mtime_ns", "sha1"}
+        self._blobs = OrderedDict()  # sha1 -> bytes
+        self._blob_bytes = 0
+
+    def _refresh(self):
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime == self._dir_mtime:
+            return
+        index = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not (entry.is_file() and entry.name.lower().endswith(".mp3")):
+                    continue
+                stat = entry.stat()
+                prev = self._index.get(entry.name)
+                same = prev and prev["size"] == stat.st_size and prev["mtime_ns"] == stat.st_mtime_ns
+                index[entry.name] = {
+                    "path": entry.path,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha1": prev["sha1"] if same else None,
+                }
+        self._index = index
+        self._dir_mtime = mtime
+
+    @timed("Start.audio_tracks")
+    def tracks(self):
+        """MP3 ファイル名の一覧（名前順）"""
+        with self._lock:
+            self._refresh()
+            return sorted(self._index)
+
+    @timed("Start.audio_read")
+    def read(self, name):
+        """MP3 の中身を返す。キャッシュ済みなら stat するだけで中身は読まない"""
+        with self._lock:
+            self._refresh()
+            meta = self._index.get(name)
+            if meta is None:
+                raise FileNotFoundError(name)
+            stat = os.stat(meta["path"])
+            if (stat.st_size, stat.st_mtime_ns) != (meta["size"], meta["mtime_ns"]):
+                # 同じ名前のまま中身が変わった：ハッシュを捨てて読み直す
+                meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns, sha1=None)
+                count("Start.audio_changed")
+            sha1 = meta["sha1"]
+            if sha1 in self._blobs:
+                self._blobs.move_to_end(sha1)
+                count("Start.audio_cache_hit")
+                return self._blobs[sha1]
+            path, stamp = meta["path"], (meta["size"], meta["mtime_ns"])
+
+        with open(path, "rb") as f:
+            data = f.read()
+        sha1 = hashlib.sha1(data).hexdigest()
+
+        with self._lock:
+            # 読んでいる間に他の呼び出しが変更に気付いていたら、古い内容のハッシュは付けない
+            if self._index.get(name) is meta and (meta["size"], meta["mtime_ns"]) == stamp:
+                meta["sha1"] = sha1
+            if sha1 not in self._blobs and len(data) <= self.max_bytes:
+                self._blobs[sha1] = data
+                self._blob_bytes += len(data)
+                while self._blob_bytes > self.max_bytes:
+                    _, evicted = self._blobs.popitem(last=False)
+                    self._blob_bytes -= len(evicted)
+        return data
+
+
+@shared_resource(key=lambda directory=".", **kwargs: os.path.abspath(directory))
+def get_library(directory=".", **kwargs) -> AudioLibrary:
+    return AudioLibrary(directory, **kwargs)
@@ -0,0 +1,104 @@
+"""ページ初回表示時の import 時間レポート（python -X importtime）
+
+ページごとに新しいプロセスを `-X importtime` で起動し、streamlit と AppTest を読み込んだ
+あとに印を出してからページを1回だけ実行する（ボタンは押さない＝初回表示）。
+印より後の import 行だけを集計するので、streamlit 本体の分は含まれない。
+
+    python bench/bench_imports.py
+    python bench/bench_imports.py --output imports_after.json --baseline imports_before.json
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+MARKER = "bench_imports: page start"
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+TOP_N = 6
+
+
+def worker(page, workdir):
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=60)
+    at.secrets["OPENAI_API_KEY"] = "stub"
+    print(MARKER, file=sys.stderr, flush=True)
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].value}")
+
+
+def parse_importtime(stderr):
+    """印より後の import を集計する -> (合計 ms, {トップレベルのパッケージ: ms})"""
+    _, _, after = stderr.partition(MARKER)
+    total_us = 0
+    by_package = defaultdict(int)
+    for line in after.splitlines():
+        m = LINE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, name = int(m[1]), int(m[2]), m[3], m[4]
+        if not indent:
+            total_us += cumulative_us
+        by_package[name.split(".")[0]] += self_us
+    return total_us / 1000, {k: v / 1000 for k, v in by_package.items()}
+
+
+def measure(page, workdir):
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--worker", page, "--workdir", workdir],
+        capture_output=True, text=True,
+    )
+    if out.returncode != 0:
+        raise SystemExit(f"{page} failed:\n{out.stderr[-2000:]}")
+    total_ms, by_package = parse_importtime(out.stderr)
+    top = dict(sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:TOP_N])
+    return {"import_ms": total_ms, "modules": len(by_package), "top_packages_ms": top}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1000, help="合成する学習セッション数")
+    parser.add_argument("--output", help="結果を JSON で保存する")
+    parser.add_argument("--baseline", help="比較する過去の結果（JSON）")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.workdir)
+        return 0
+
+    sys.path.insert(0, HERE)
+    from bench_pages import PAGES, make_workdir
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    workdir = make_workdir(args.size)
+    results = {}
+    for page in PAGES:
+        result = results[page] = measure(page, workdir)
+        before = baseline.get(page, {}).get("import_ms")
+        delta = f" (before {before:7.1f} ms, {result['import_ms'] - before:+7.1f} ms)" if before else ""
+        top = ", ".join(f"{name} {ms:.0f}" for name, ms in result["top_packages_ms"].items())
+        print(f"{page:<11} import {result['import_ms']:7.1f} ms{delta} | {top}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"wrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
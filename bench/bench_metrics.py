@@ -0,0 +1,103 @@
+"""compute_metrics のスケールベンチマーク
+
+合成セッション（10k / 100k / 1M件）を生成し、旧実装（セッション全件を pandas で
+groupby → 1日ずつ遡る連続日数ループ）と、日次集計＋ベクトル化した現行実装の
+レイテンシとピークメモリ（tracemalloc）を比較する。
+
+    python bench/bench_metrics.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from study_metrics import APP_TZ, compute_metrics  # noqa: E402
+
+
+def make_sessions(n: int, years: int = 3, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp.now(tz="UTC")
+    offsets = rng.integers(0, years * 365 * 86400, size=n)
+    started = (end - pd.to_timedelta(offsets, unit="s")).sort_values()
+    focus = rng.integers(300, 3600, size=n)
+    return pd.DataFrame({
+        "session_id": np.arange(1, n + 1),
+        "user_id": 1,
+        "started_at_utc": started,
+        "finished_at_utc": started + pd.to_timedelta(focus, unit="s"),
+        "focus_seconds": focus,
+        "note": None,
+    })
+
+
+def legacy_compute_metrics(df: pd.DataFrame):
+    # 変更前の実装（Stats.compute_metrics）をそのまま再現
+    df = df.copy()
+    df["started_local"] = df["started_at_utc"].dt.tz_convert(APP_TZ)
+    df["finished_local"] = df["finished_at_utc"].dt.tz_convert(APP_TZ)
+    df["focus_seconds"] = df["focus_seconds"].fillna(0).astype(int)
+    df["local_date"] = df["started_local"].dt.date
+    by_day = df.groupby("local_date", as_index=False)["focus_seconds"].sum()
+    total_seconds = int(by_day["focus_seconds"].sum())
+    today_local = datetime.now(APP_TZ).date()
+    seven_days_ago = today_local - timedelta(days=6)
+    last7 = by_day[(by_day["local_date"] >= seven_days_ago) & (by_day["local_date"] <= today_local)]
+    last7_seconds = int(last7["focus_seconds"].sum())
+    learned_days = set(by_day[by_day["focus_seconds"] > 0]["local_date"].tolist())
+    start_date = today_local if today_local in learned_days else (today_local - timedelta(days=1))
+    streak = 0
+    cur = start_date
+    while cur in learned_days:
+        streak += 1
+        cur = cur - timedelta(days=1)
+    return {"total_seconds": total_seconds, "last7_seconds": last7_seconds, "streak_days": streak}
+
+
+def to_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    # daily_rollup テーブルの中身に相当（finish_session で逐次更新される）
+    local_date = df["started_at_utc"].dt.tz_convert(APP_TZ).dt.date
+    return df.groupby(local_date.rename("local_date"), as_index=False)["focus_seconds"].sum()
+
+
+def measure(fn, arg, repeat: int):
+    fn(arg)  # ウォームアップ
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(arg)
+    latency = (time.perf_counter() - t0) / repeat
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, latency, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'sessions':>10} {'days':>6} | {'before ms':>10} {'before MiB':>10} | {'after ms':>9} {'after MiB':>9}")
+    for n in args.sizes:
+        sessions = make_sessions(n)
+        rollup = to_rollup(sessions)
+        before, t_before, m_before = measure(legacy_compute_metrics, sessions, args.repeat)
+        after, t_after, m_after = measure(compute_metrics, rollup, args.repeat)
+        for key in ("total_seconds", "last7_seconds", "streak_days"):
+            assert before[key] == after[key], (key, before[key], after[key])
+        print(
+            f"{n:>10} {len(rollup):>6} | {t_before * 1000:>10.2f} {m_before / 2**20:>10.2f}"
+            f" | {t_after * 1000:>9.2f} {m_after / 2**20:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
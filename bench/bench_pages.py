@@ -0,0 +1,257 @@
+"""全ページの再実行レイテンシ・ベンチマーク（ヘッドレス、Streamlit AppTest）
+
+データ量を変えて data/study.db と tasks.db を合成し、OpenAI と Walkerplus は
+ローカルのスタブに差し替えたうえで、各ページの
+  - cold：新しいプロセスでの初回実行（import を含む）
+  - warm：ページごとの代表的な操作をしたときの再実行の中央値 / p95
+      Start.py   ▶ 開始／再開 と ⏸ 一時停止 を交互に（学習記録オン）
+      Split.py   タスクを入力して「分割する」（OpenAI はスタブ、毎回別のタスク）
+      Stats.py   ▶ 開始（Start）→ ■ 終了（Finish）→ 履歴のページ送り を繰り返す
+      rewards.py ガチャを回す（Walkerplus はスタブ）
+  - メモリ：プロセスのピーク RSS と、warm 再実行中の Python 割り当てピーク（tracemalloc）
+を計測する。ページごとに別プロセスで動かすので、プロセス単位のキャッシュは持ち越さない。
+
+結果は JSON で書き出し、保存済みのベースライン（既定は bench/baseline_pages.json）と比べて
+閾値を超えて遅くなったものを報告する（1つでもあれば終了コード 1）。
+ベースラインは測ったマシンでの値なので、別のマシンでは取り直してから比べる（--output で上書き）。
+
+    python bench/bench_pages.py --threshold 0.2
+    python bench/bench_pages.py --output bench/baseline_pages.json --baseline ""
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+PAGES = ["Start.py", "Split.py", "Stats.py", "rewards.py"]
+METRICS = ("cold_ms", "warm_p50_ms", "warm_p95_ms")
+BASELINE = os.path.join(HERE, "baseline_pages.json")
+
+
+# ---------- データ合成（スキーマと書き込みはアプリと同じ関数で） ----------
+def seed_worker(workdir, sessions, tasks, subtasks_per_task=4, seed=0):
+    # study_store は ./data/study.db を開くので、作業ディレクトリに移ってから import する
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir)
+    import study_store
+    import task_store
+
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    starts = sorted(now - timedelta(seconds=rng.randrange(3 * 365 * 86400)) for _ in range(sessions))
+    study_store.init_db()
+    with study_store.get_conn():  # 1トランザクションで
+        for started in starts:
+            focus = rng.randrange(300, 3600)
+            session_id = study_store.insert_session_start(1, started)
+            study_store.finish_session(session_id, started + timedelta(seconds=focus), focus)
+
+    task_store.init_db()
+    with task_store.get_db().cursor():  # 1トランザクションで
+        for n in range(tasks):
+            task_store.save_split(
+                f"合成タスク {n}",
+                "\n".join(f"{k}. ステップ{k}（25分）" for k in range(1, subtasks_per_task + 1)),
+            )
+        # 子タスクの半分は完了済みに
+        task_store.set_subtasks_done([
+            (subtask_id, True)
+            for _, _, subtasks in task_store.load_task_page(0, per_page=tasks)
+            for subtask_id, _, _ in subtasks[::2]
+        ])
+
+
+# ---------- 1ページ分の計測（子プロセス） ----------
+def worker(page, workdir, warm_runs):
+    t0 = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    sys.path.insert(0, HERE)
+    os.chdir(workdir)
+
+    from llm_stub import start_stub
+    import http.server
+    import threading
+
+    llm = start_stub(first_token_latency=0.0, token_interval=0.0)
+    os.environ["OPENAI_BASE_URL"] = llm.base_url
+
+    class Walkerplus(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(listing)))
+            self.end_headers()
+            self.wfile.write(listing)
+
+        def log_message(self, *args):
+            pass
+
+    wp = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Walkerplus)
+    threading.Thread(target=wp.serve_forever, daemon=True).start()
+    os.environ["WALKERPLUS_BASE_URL"] = f"http://127.0.0.1:{wp.server_port}"
+    # bench_scraper は event_scraper を import するので、BASE_URL を差し替えてから読む
+    from bench_scraper import synthetic_page
+    listing = synthetic_page()
+
+    from streamlit.testing.v1 import AppTest
+
+    def click(at, *labels):
+        # 押せる（disabled でない）ボタンのうち、labels の先にあるものを押す
+        buttons = {b.label: b for b in at.button if not b.disabled}
+        buttons[next(label for label in labels if label in buttons)].click()
+
+    def interact(at, n):
+        # ページごとの代表的な操作（モジュールの docstring を参照）
+        if page == "Start.py":
+            click(at, "▶ 開始／再開" if n % 2 == 0 else "⏸ 一時停止")
+        elif page == "Split.py":
+            at.text_area[0].input(f"{n}件目のレポートを仕上げる")
+            click(at, "分割する")
+        elif page == "Stats.py":
+            click(at, *[("▶ 開始（Start）",), ("■ 終了（Finish）",), ("古い →", "← 新しい")][n % 3])
+        elif page == "rewards.py":
+            click(at, at.button[0].label)
+        return at.run()
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=60)
+    at.secrets["OPENAI_API_KEY"] = "stub"
+    at.run()
+    cold = time.perf_counter() - t0
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].value}")
+
+    warm = []
+    for n in range(warm_runs):
+        t = time.perf_counter()
+        interact(at, n)
+        warm.append(time.perf_counter() - t)
+        if at.exception:
+            raise RuntimeError(f"{page}: {at.exception[0].value}")
+
+    tracemalloc.start()
+    interact(at, warm_runs)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if page == "Split.py" and not llm.requests:
+        raise RuntimeError("Split.py: 分割が OpenAI スタブを呼んでいない")
+
+    warm.sort()
+    return {
+        "cold_ms": cold * 1000,
+        "warm_p50_ms": statistics.median(warm) * 1000,
+        "warm_p95_ms": warm[min(len(warm) - 1, int(len(warm) * 0.95))] * 1000,
+        "rerun_alloc_peak_kib": traced_peak / 1024,
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def make_workdir(size):
+    """size 件のセッション（タスクはその1/10）を入れた作業ディレクトリを作る"""
+    workdir = tempfile.mkdtemp(prefix=f"bench_pages_{size}_")
+    subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--seed", str(size), "--workdir", workdir],
+        check=True,
+    )
+    with open(os.path.join(ROOT, "rewards.csv"), "rb") as src, \
+            open(os.path.join(workdir, "rewards.csv"), "wb") as dst:
+        dst.write(src.read())
+    # rewards.py の背景画像・効果音のダミー
+    for name, kib in (("backgroundimg.jpg", 300), ("ラッパのファンファーレ.mp3", 100)):
+        with open(os.path.join(workdir, name), "wb") as f:
+            f.write(os.urandom(kib * 1024))
+    return workdir
+
+
+# ---------- 全体 ----------
+def run_all(sizes, warm_runs, rounds=1):
+    results = {}
+    for size in sizes:
+        workdir = make_workdir(size)
+        for page in PAGES:
+            runs = []
+            for _ in range(rounds):
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--worker", page,
+                     "--workdir", workdir, "--warm-runs", str(warm_runs)],
+                    capture_output=True, text=True,
+                )
+                if out.returncode != 0:
+                    raise SystemExit(f"{page} (size={size}) failed:\n{out.stderr[-2000:]}")
+                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            # 別プロセスで rounds 回測り、指標ごとの中央値を取る（ばらつき対策）
+            result = {metric: statistics.median(r[metric] for r in runs) for metric in runs[0]}
+            results[f"{page}@{size}"] = result
+            print(f"{page:<11} size={size:<7} cold {result['cold_ms']:8.1f} ms | "
+                  f"warm p50 {result['warm_p50_ms']:7.1f} ms p95 {result['warm_p95_ms']:7.1f} ms | "
+                  f"rss {result['max_rss_mib']:6.1f} MiB alloc {result['rerun_alloc_peak_kib']:8.1f} KiB")
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms=0.0):
+    # 増加率が threshold を超え、かつ差が min_delta_ms 以上のものを劣化とする（数 ms の揺れは無視）
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in METRICS:
+            if base.get(metric) and result[metric] > base[metric] * (1 + threshold) \
+                    and result[metric] - base[metric] >= min_delta_ms:
+                regressions.append((key, metric, base[metric], result[metric]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000],
+                        help="合成する学習セッション数（タスク数はその1/10）")
+    parser.add_argument("--warm-runs", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3, help="ページごとに測るプロセス数（中央値を取る）")
+    parser.add_argument("--output", default="bench_pages.json")
+    parser.add_argument("--baseline", default=BASELINE, help="比較する過去の結果（JSON）。空文字で比較しない")
+    parser.add_argument("--threshold", type=float, default=0.2, help="劣化とみなす増加率")
+    parser.add_argument("--min-delta-ms", type=float, default=20.0, help="これより小さい差は劣化とみなさない")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--seed", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.workdir, args.warm_runs)))
+        return 0
+    if args.seed is not None:
+        seed_worker(args.workdir, args.seed, max(1, args.seed // 10))
+        return 0
+
+    results = run_all(args.sizes, args.warm_runs, args.rounds)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "settings": {"warm_runs": args.warm_runs, "rounds": args.rounds},
+            "results": results,
+        }, f, indent=2)
+    print(f"wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for key, metric, before, after in regressions:
+            print(f"REGRESSION {key} {metric}: {before:.1f} -> {after:.1f} ms")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""ご褒美カタログの抽選スループット（draws/秒）
+
+カタログの件数を変えて、
+  - 変更前相当：random.choices(items, weights)（毎回 O(n) で累積和を作る）
+  - 変更後：AliasTable.sample()（O(1)）
+を比較する。あわせてエイリアステーブルの構築時間も出す。
+
+    python bench/bench_reward_draws.py --sizes 100 10000 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reward_catalog import RARITY_WEIGHTS, AliasTable  # noqa: E402
+
+
+def rate(fn, seconds):
+    n = 0
+    t0 = time.perf_counter()
+    deadline = t0 + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn()
+        n += 100
+    return n / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--seconds", type=float, default=1.0, help="各計測の時間")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    tiers = list(RARITY_WEIGHTS.values())
+    print(f"{'items':>9} | {'build ms':>9} | {'choices draws/s':>16} | {'alias draws/s':>14}")
+    for n in args.sizes:
+        items = list(range(n))
+        weights = [rng.choice(tiers) for _ in items]
+        t0 = time.perf_counter()
+        table = AliasTable(weights)
+        build = time.perf_counter() - t0
+        before = rate(lambda: random.choices(items, weights), args.seconds)
+        after = rate(lambda: items[table.sample()], args.seconds)
+        print(f"{n:>9} | {build * 1000:>9.1f} | {before:>16,.0f} | {after:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
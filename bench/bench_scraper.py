@@ -0,0 +1,125 @@
+"""イベント一覧スクレイピングのベンチマーク
+
+保存済みのフィクスチャページ（指定が無ければ合成ページ）を使って
+  - 解析時間：html.parser で全体を木にする旧方式 vs <a> だけに絞った parse_events
+  - 転送量：毎回フル取得する旧方式 vs ETag / Last-Modified による条件付き取得
+を比較する。転送量はローカルの HTTP サーバーから配信して計測する。
+
+    python bench/bench_scraper.py [fixture.html ...] --fetches 20
+"""
+import argparse
+import hashlib
+import http.server
+import os
+import sys
+import threading
+import time
+
+import requests
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_scraper import PARSER, EventScraper, parse_events  # noqa: E402
+
+
+def synthetic_page(items=60, filler=400):
+    # 実ページに近い構造：ナビ・広告などの要素が大量にある中に一覧が並ぶ
+    noise = "".join(
+        f'<div class="m-side"><p>広告 {i}</p><ul><li>項目</li><li>項目</li></ul><img src="/x{i}.png"></div>'
+        for i in range(filler)
+    )
+    listing = "".join(
+        f'<li class="m-mainlist-item"><a href="/event/ar1040e{i}/"><div><span class="m-mainlist-item__ttl">'
+        f"イベント {i}</span><p>会場・日時</p></div></a></li>"
+        for i in range(items)
+    )
+    return f"<html><head><title>x</title></head><body>{noise}<ul>{listing}</ul>{noise}</body></html>".encode()
+
+
+def legacy_parse(html):
+    soup = BeautifulSoup(html, "html.parser")
+    events = []
+    for title_element in soup.find_all("span", class_="m-mainlist-item__ttl"):
+        link_element = title_element.find_parent("a")
+        if link_element and "href" in link_element.attrs:
+            events.append((title_element.get_text(strip=True), "https://www.walkerplus.com" + link_element["href"]))
+    return events
+
+
+def serve(pages):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        sent = 0
+
+        def do_GET(self):
+            body = pages[self.path]
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timeit(fn, arg, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(arg)
+    return result, (time.perf_counter() - t0) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fixtures", nargs="*", help="保存した一覧ページのHTML")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--fetches", type=int, default=20, help="同じページを取得する回数")
+    args = parser.parse_args()
+
+    pages = {}
+    for n, path in enumerate(args.fixtures):
+        with open(path, "rb") as f:
+            pages[f"/page{n}/"] = f.read()
+    if not pages:
+        pages["/synthetic/"] = synthetic_page()
+
+    print(f"parser backend: {PARSER}")
+    for path, html in pages.items():
+        before, t_before = timeit(legacy_parse, html, args.repeat)
+        after, t_after = timeit(parse_events, html, args.repeat)
+        assert before == after, "parse results differ"
+        print(f"{path}: {len(html) / 1024:.0f} KiB, {len(after)} events | "
+              f"parse before {t_before * 1000:.1f} ms, after {t_after * 1000:.1f} ms")
+
+    server = serve(pages)
+    base = f"http://127.0.0.1:{server.server_port}"
+    urls = [base + path for path in pages]
+
+    legacy_bytes = 0
+    for _ in range(args.fetches):
+        for url in urls:
+            legacy_bytes += len(requests.get(url, timeout=10).content)
+
+    scraper = EventScraper(base_url="")
+    for _ in range(args.fetches):
+        for url in urls:
+            scraper.fetch(url)
+    server.shutdown()
+
+    print(f"{args.fetches} fetches x {len(urls)} page(s): bytes before {legacy_bytes:,}, "
+          f"after {scraper.bytes_received:,} (body bytes only)")
+
+
+if __name__ == "__main__":
+    main()
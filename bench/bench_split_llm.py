@@ -0,0 +1,82 @@
+"""Split.py の LLM 呼び出し：逐次 vs 並行＋ストリーミング
+
+ローカルのスタブ（bench/llm_stub.py）に対して、
+  - 変更前：分割 → 称賛 を順番に非ストリーミングで呼ぶ（最初の表示は両方の完了後）
+  - 変更後：称賛を裏で投げつつ分割をストリーミング（最初の表示は最初のトークン）
+の「最初の表示までの時間」と「全体の時間」を比較する。
+
+    python bench/bench_split_llm.py --latency 1.5 --token-interval 0.02
+"""
+import argparse
+import os
+import sys
+import time
+
+from openai import OpenAI
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from llm_stub import start_stub  # noqa: E402
+from task_llm import (  # noqa: E402
+    MODEL,
+    SPLIT_TEMPERATURE,
+    generate_praise,
+    split_prompt,
+    stream_split,
+    submit_praise,
+)
+
+TASK = "統計学の期末試験に向けて第3章〜第5章を復習する"
+
+
+def before(client):
+    t0 = time.perf_counter()
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": split_prompt(TASK)}],
+        temperature=SPLIT_TEMPERATURE,
+    )
+    split_result = response.choices[0].message.content
+    generate_praise(client, TASK)
+    total = time.perf_counter() - t0
+    return total, total, split_result
+
+
+def after(client):
+    t0 = time.perf_counter()
+    first = None
+    praise = submit_praise(client, TASK)
+    parts = []
+    for token in stream_split(client, TASK):
+        if first is None:
+            first = time.perf_counter() - t0
+        parts.append(token)
+    praise.result()
+    return first, time.perf_counter() - t0, "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=1.0, help="最初のトークンまでの秒数")
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    server = start_stub(first_token_latency=args.latency, token_interval=args.token_interval)
+    client = OpenAI(base_url=server.base_url, api_key="stub", max_retries=0)
+
+    print(f"stub latency={args.latency}s token_interval={args.token_interval}s")
+    print(f"{'mode':<34} {'first output s':>15} {'total s':>9}")
+    for name, fn in (("before: sequential, non-streamed", before), ("after: concurrent + streamed", after)):
+        runs = [fn(client) for _ in range(args.repeat)]
+        first = sum(r[0] for r in runs) / len(runs)
+        total = sum(r[1] for r in runs) / len(runs)
+        assert all(r[2] == runs[0][2] for r in runs)
+        print(f"{name:<34} {first:>15.2f} {total:>9.2f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Split.py の書き込み：コミット数（= fsync 数）と時間のベンチマーク
+
+  - 分割結果の保存：親タスクをコミット → 子タスクを1行ずつ INSERT → コミット（変更前）
+                    vs 親＋子を1トランザクション・executemany（変更後）
+  - チェックの反映：変更のたびに UPDATE → コミット（変更前）
+                    vs 描画中に集めて再実行ごとに1回だけ反映（変更後）
+
+synchronous=FULL にして、WAL モードでは1コミット＝WAL への fsync 1回になるようにして計測する。
+
+    python bench/bench_split_writes.py --subtasks 5 --toggles 30
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_store  # noqa: E402
+from storage import get_pool  # noqa: E402
+
+SPLIT_RESULT = "\n".join(f"{n}. ステップ{n}" for n in range(1, 6))
+
+
+class CommitCounter:
+    def __init__(self):
+        self.commits = 0
+
+    def __call__(self, statement):
+        if statement.strip().upper().startswith("COMMIT"):
+            self.commits += 1
+
+
+def legacy_save(db, task, split_result):
+    with db.cursor() as cursor:
+        cursor.execute("INSERT INTO tasks (title) VALUES (?)", (task,))
+        parent_id = cursor.lastrowid
+        cursor.connection.commit()
+        for line in split_result.strip().split("\n"):
+            clean_line = line.strip()
+            if clean_line and clean_line != task:
+                cursor.execute(
+                    "INSERT INTO subtasks (parent_id, content, estimated_time) VALUES (?, ?, ?)",
+                    (parent_id, clean_line, "25分"),
+                )
+        cursor.connection.commit()
+    return parent_id
+
+
+def legacy_toggle(db, changes):
+    for subtask_id, done in changes:
+        with db.cursor() as cursor:
+            cursor.execute("UPDATE subtasks SET is_done = ? WHERE id = ?", (int(done), subtask_id))
+            cursor.connection.commit()
+
+
+def run(path, save, toggle, reruns, toggles):
+    db = get_pool(path)
+    counter = CommitCounter()
+    with db.connection() as conn:
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.set_trace_callback(counter)
+    counter.commits = 0
+
+    t0 = time.perf_counter()
+    for n in range(reruns):
+        save(f"task {n}", SPLIT_RESULT)
+    save_commits, save_time = counter.commits / reruns, (time.perf_counter() - t0) / reruns
+
+    with db.cursor() as cursor:
+        ids = [row[0] for row in cursor.execute("SELECT id FROM subtasks LIMIT ?", (toggles,))]
+    counter.commits = 0
+    t0 = time.perf_counter()
+    for n in range(reruns):
+        toggle([(subtask_id, n % 2 == 0) for subtask_id in ids])
+    toggle_commits, toggle_time = counter.commits / reruns, (time.perf_counter() - t0) / reruns
+    db.close_all()
+    return save_commits, save_time, toggle_commits, toggle_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--toggles", type=int, default=30, help="1回の再実行で反映するチェック変更数")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_split_writes_")
+    results = {}
+    for name in ("before", "after"):
+        path = os.path.join(tmp, f"{name}.db")
+        task_store.init_db(path)
+        db = get_pool(path)
+        if name == "before":
+            results[name] = run(
+                path,
+                lambda task, result: legacy_save(db, task, result),
+                lambda changes: legacy_toggle(db, changes),
+                args.reruns, args.toggles,
+            )
+        else:
+            results[name] = run(
+                path,
+                lambda task, result: task_store.save_split(task, result, path=path),
+                lambda changes: task_store.set_subtasks_done(changes, path=path),
+                args.reruns, args.toggles,
+            )
+
+    print(f"per rerun, synchronous=FULL (1 commit = 1 WAL fsync), {args.toggles} checkbox changes")
+    print(f"{'':<8} {'save commits':>12} {'save ms':>8} {'toggle commits':>15} {'toggle ms':>10}")
+    for name, (sc, st, tc, tt) in results.items():
+        print(f"{name:<8} {sc:>12.1f} {st * 1000:>8.2f} {tc:>15.1f} {tt * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
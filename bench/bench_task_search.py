@@ -0,0 +1,86 @@
+"""Split.py のタスク検索：FTS5（trigram）索引 vs LIKE による全件走査
+
+tasks.db に合成タスク（子タスク4件ずつ）を入れ、同じ検索語で
+  - 変更前：tasks.title / subtasks.content に LIKE '%語%' をかける（索引なしの全件走査）
+  - 変更後：task_store.search_tasks（tasks_fts MATCH、bm25 順。2文字の語は語彙から引いた trigram の OR）
+のレイテンシを比べる。一致したタスクの集合が同じことも確かめる（件数上限は外して比較）。
+
+    python bench/bench_task_search.py --sizes 10000 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import task_store  # noqa: E402
+
+SUBJECTS = ["英語", "数学", "物理", "歴史", "レポート", "プレゼン", "論文", "資格試験", "プログラミング", "部屋の掃除"]
+VERBS = ["資料を集める", "要点をまとめる", "問題集を解く", "下書きを書く", "見直しをする", "単語を覚える",
+         "スライドを作る", "過去問を解く", "コードを書く", "テストを書く"]
+WORDS = ["report", "review", "outline", "draft", "chapter", "vocabulary", "exercise", "summary"]
+QUERIES = ["レポート", "過去問を解く", "vocab", "論文 下書き", "プログラミング テスト", "chapter 12", "存在しない語句",
+           # 2文字の語（語彙から trigram を引く）と1文字の語（LIKE）
+           "英語", "数学", "論文", "英語 report", "12", "英"]
+
+
+def seed(path, tasks, rng):
+    task_store.init_db(path)
+    with task_store.get_db(path).cursor() as cursor:
+        for n in range(tasks):
+            title = f"{rng.choice(SUBJECTS)}の{rng.choice(['準備', '課題', '復習', '仕上げ'])} {rng.choice(WORDS)} {n}"
+            cursor.execute("INSERT INTO tasks (title) VALUES (?)", (title,))
+            parent_id = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO subtasks (parent_id, content, estimated_time) VALUES (?, ?, '25分')",
+                [(parent_id, f"{k}. {rng.choice(VERBS)}（{rng.choice(WORDS)} chapter {rng.randrange(30)}）")
+                 for k in range(1, 5)],
+            )
+
+
+def like_scan(path, query):
+    # 変更前の相当：語ごとに タイトル or いずれかの子タスク に含まれるものを全件から探す
+    terms = query.split()
+    where = " AND ".join(
+        "(t.title LIKE ? OR EXISTS (SELECT 1 FROM subtasks AS s WHERE s.parent_id = t.id AND s.content LIKE ?))"
+        for _ in terms
+    )
+    params = [p for t in terms for p in (f"%{t}%", f"%{t}%")]
+    with task_store.get_db(path).cursor() as cursor:
+        return {row[0] for row in cursor.execute(f"SELECT t.id FROM tasks AS t WHERE {where}", params)}
+
+
+def latency(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return result, statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>7} {'query':<24} {'hits':>6} | {'LIKE ms':>9} {'FTS ms':>8} {'speedup':>8}")
+    for size in args.sizes:
+        path = os.path.join(tempfile.mkdtemp(prefix="bench_task_search_"), "tasks.db")
+        seed(path, size, random.Random(size))
+        for query in QUERIES:
+            expected, like_ms = latency(lambda: like_scan(path, query), args.repeat)
+            tree, fts_ms = latency(lambda: task_store.search_tasks(query, path=path), args.repeat)
+            everything = task_store.search_tasks(query, limit=size, path=path)
+            assert {task_id for task_id, _, _ in everything} == expected, query
+            print(f"{size:>7} {query:<24} {len(expected):>6} | {like_ms:>9.2f} {fts_ms:>8.2f} {like_ms / fts_ms:>7.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
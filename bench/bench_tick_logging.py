@@ -0,0 +1,91 @@
+"""学習記録（SessionLogger）のオン／オフで Start.py の1tickの時間が変わらないことを確かめる
+
+AppTest でタイマーを動かし、countdown フラグメントだけの再実行（本番の run_every=1 と同じ）
+の時間を記録オフ／オンで少しずつ交互に計測して比べる。記録オンでも tick で
+行うのはキューへの追加だけで、DB への書き込みは裏のスレッドが FLUSH_INTERVAL ごとに行う。
+差が --tolerance を超えたら終了コード 1。
+
+    python bench/bench_tick_logging.py --rounds 40
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, HERE)
+
+from bench_timer_cpu import START_PY, fragment_only  # noqa: E402
+
+
+def tick_times(at, ticks):
+    times = []
+    for _ in range(ticks):
+        t0 = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def started_app(log_enabled):
+    at = AppTest.from_file(START_PY).run()
+    at.toggle[0].set_value(log_enabled).run()
+    at.button[0].click().run()  # ▶ 開始
+    assert at.session_state.running, "timer did not start"
+    return at
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=25, help="1ラウンドで続けて計測する tick 数")
+    parser.add_argument("--rounds", type=int, default=24)
+    parser.add_argument("--tolerance", type=float, default=0.10, help="許容する p50 の増加率")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_tick_logging_")
+    os.chdir(workdir)
+
+    apps = {False: started_app(False), True: started_app(True)}
+    fragment_ids = {k: next(iter(at._fragment_storage._fragments)) for k, at in apps.items()}
+    results = {False: [], True: []}
+    for n in range(args.rounds + 1):
+        # 順番の影響を消すため、オン／オフの順を毎ラウンド入れ替える（最初のラウンドは捨てる）
+        for enabled in (n % 2 == 0, n % 2 == 1):
+            at = apps[enabled]
+            orig = fragment_only(fragment_ids[enabled])
+            try:
+                times = tick_times(at, args.ticks)
+                if n:
+                    results[enabled] += times
+            finally:
+                local_script_runner.RerunData = orig
+
+    from session_logger import get_session_logger
+
+    get_session_logger().flush()
+    with sqlite3.connect(os.path.join("data", "study.db")) as conn:
+        logged = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        checkpoints = conn.execute("SELECT COUNT(*) FROM session_checkpoints").fetchone()[0]
+    assert logged == 1 and checkpoints == 1, (logged, checkpoints)
+
+    print(f"{'logging':<8} {'ticks':>6} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    p50 = {}
+    for enabled, times in results.items():
+        times.sort()
+        p50[enabled] = statistics.median(times)
+        print(f"{'on' if enabled else 'off':<8} {len(times):>6} {p50[enabled] * 1000:>8.2f} "
+              f"{times[int(len(times) * 0.95)] * 1000:>8.2f} {statistics.fmean(times) * 1000:>8.2f}")
+    change = p50[True] / p50[False] - 1
+    print(f"p50 change with logging on: {change:+.1%} (tolerance {args.tolerance:.0%})")
+    return 0 if change <= args.tolerance else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
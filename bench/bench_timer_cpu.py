@@ -0,0 +1,83 @@
+"""Start.py のタイマー1tickあたりのサーバーCPU時間を計測する
+
+AppTest でページを動かし、タイマー動作中の
+  - 全体再実行（変更前：毎秒 time.sleep(1) → st.rerun() でスクリプト全体を再実行）
+  - フラグメントのみ再実行（変更後：countdown フラグメントの run_every=1）
+それぞれの CPU 時間を比較する。AppTest 自体のオーバーヘッドは空スクリプトの
+実行時間を差し引いて補正する。BGM はフォルダのMP3選択モードで計測する。
+
+    python bench/bench_timer_cpu.py --ticks 50
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_PY = os.path.join(ROOT, "Start.py")
+# Start.py は記録用のスレッドから study_store などを import する
+sys.path.insert(0, ROOT)
+
+
+def cpu_per_run(at, ticks):
+    t0 = time.process_time()
+    for _ in range(ticks):
+        at.run()
+    return (time.process_time() - t0) / ticks
+
+
+def fragment_only(fragment_id):
+    # フロントエンドの auto rerun と同じく、フラグメントだけを再実行させる
+    orig = local_script_runner.RerunData
+
+    def rerun_data(**kwargs):
+        return orig(**kwargs, fragment_id_queue=[fragment_id], is_auto_rerun=True)
+
+    local_script_runner.RerunData = rerun_data
+    return orig
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--mp3-count", type=int, default=20)
+    parser.add_argument("--mp3-mib", type=float, default=4.0)
+    args = parser.parse_args()
+
+    # ダミーのBGMフォルダを作ってそこをカレントにする（os.listdir(".") 対象）
+    workdir = tempfile.mkdtemp(prefix="bench_timer_")
+    payload = os.urandom(int(args.mp3_mib * 2**20))
+    for n in range(args.mp3_count):
+        with open(os.path.join(workdir, f"bgm{n:02d}.mp3"), "wb") as f:
+            f.write(payload)
+    os.chdir(workdir)
+
+    empty = AppTest.from_string("import streamlit as st").run()
+    overhead = cpu_per_run(empty, args.ticks)
+
+    at = AppTest.from_file(START_PY).run()
+    at.radio[1].set_value("フォルダのMP3から選ぶ").run()
+    at.button[0].click().run()  # ▶ 開始
+    assert at.session_state.running, "timer did not start"
+
+    full = cpu_per_run(at, args.ticks) - overhead
+    fragment_id = next(iter(at._fragment_storage._fragments))
+    orig = fragment_only(fragment_id)
+    try:
+        frag = cpu_per_run(at, args.ticks) - overhead
+    finally:
+        local_script_runner.RerunData = orig
+
+    per_session = 25 * 60
+    print(f"AppTest overhead per run: {overhead * 1000:.2f} ms (subtracted)")
+    print(f"{'mode':<28} {'CPU ms/tick':>12} {'CPU s/25min':>12} {'thread held':>12}")
+    print(f"{'before: full rerun + sleep':<28} {full * 1000:>12.2f} {full * per_session:>12.2f} {'1.0 s/tick':>12}")
+    print(f"{'after: fragment run_every':<28} {frag * 1000:>12.2f} {frag * per_session:>12.2f} {'0 s/tick':>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""OpenAI chat completions エンドポイントのローカルスタブ
+
+ネットワーク無しで Split.py の LLM 呼び出しを計測するためのもの。
+最初の応答までの待ち時間とトークン間隔を指定できる（stream=True なら SSE で返す）。
+
+    server = start_stub(first_token_latency=1.0, token_interval=0.05)
+    client = OpenAI(base_url=server.base_url, api_key="stub")
+"""
+import http.server
+import json
+import threading
+import time
+
+DEFAULT_REPLY = "\n".join(
+    f"{n}. ステップ{n}：資料を読んで要点をまとめる（25分）" for n in range(1, 5)
+)
+
+
+def _completion(model, content):
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+def _chunk(model, content, finish=None):
+    delta = {"content": content} if content is not None else {}
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+
+
+def start_stub(first_token_latency=1.0, token_interval=0.02, reply=DEFAULT_REPLY):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = body.get("model", "stub")
+            server.requests += 1
+            time.sleep(first_token_latency)
+            if not body.get("stream"):
+                # 非ストリーミングは全トークン分の生成時間を待ってから返す
+                time.sleep(token_interval * len(reply))
+                payload = json.dumps(_completion(model, reply)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for token in reply:
+                self.wfile.write(f"data: {json.dumps(_chunk(model, token))}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(token_interval)
+            self.wfile.write(f"data: {json.dumps(_chunk(model, None, 'stop'))}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.requests = 0
+    server.base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
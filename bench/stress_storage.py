@@ -0,0 +1,100 @@
+"""storage.py のコネクションプールに対する同時実行ストレステスト
+
+多数のスレッド（= Streamlit のセッションを模擬）からアプリと同じ書き込み関数
+（study_store / task_store）で study.db / tasks.db に読み書きを行い、
+"database is locked" などのエラーが出ないことを確認する。
+既定では DB のコピーに対して実行する（--in-place で実ファイルに対して実行）。
+
+    python bench/stress_storage.py --sessions 64 --ops 50
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import get_pool  # noqa: E402
+
+# アプリと同じ配置（app-dir からの相対パス）
+STUDY_DB_PATH = os.path.join(".", "data", "study.db")
+TASKS_DB_PATH = "tasks.db"
+
+
+def simulate_session(study_store, task_store, user_id, ops, errors):
+    for i in range(ops):
+        try:
+            # Stats.py / Start.py 相当：開始 → 終了 → 一覧読み込み
+            session_id = study_store.insert_session_start(user_id, datetime.now(timezone.utc))
+            study_store.finish_session(session_id, datetime.now(timezone.utc), 1500)
+            with study_store.read_snapshot() as conn:
+                conn.execute("SELECT COUNT(*) FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+
+            # Split.py 相当：親タスク＋子タスク保存 → 一覧読み込み → チェック更新
+            parent_id = task_store.save_split(f"stress {user_id}-{i}", "\n".join(f"step {n}" for n in range(4)))
+            task_store.load_task_page(0)
+            with task_store.get_db().cursor() as cur:
+                first = cur.execute("SELECT MIN(id) FROM subtasks WHERE parent_id = ?", (parent_id,)).fetchone()[0]
+            task_store.set_subtasks_done([(first, True)])
+        except sqlite3.Error as e:
+            errors.append(repr(e))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", default=".", help="data/study.db と tasks.db があるディレクトリ")
+    parser.add_argument("--sessions", type=int, default=32, help="同時に動かすセッション数")
+    parser.add_argument("--ops", type=int, default=50, help="1セッションあたりの操作回数")
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument("--in-place", action="store_true", help="DBのコピーではなく実ファイルに書き込む")
+    args = parser.parse_args()
+
+    workdir = args.app_dir
+    if not args.in_place:
+        workdir = tempfile.mkdtemp(prefix="stress_storage_")
+        for path in (STUDY_DB_PATH, TASKS_DB_PATH):
+            src, dst = os.path.join(args.app_dir, path), os.path.join(workdir, path)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            if os.path.exists(src):
+                shutil.copyfile(src, dst)
+    # study_store / task_store はカレントからの相対パスで DB を開くので、移ってから import する。
+    # プールは最初に作ったときの設定で使い回されるので、import より先に --pool-size で作っておく
+    os.chdir(workdir)
+    study = get_pool(STUDY_DB_PATH, max_connections=args.pool_size, detect_types=sqlite3.PARSE_DECLTYPES)
+    tasks = get_pool(TASKS_DB_PATH, max_connections=args.pool_size)
+    import study_store
+    import task_store
+
+    study_store.init_db()
+    task_store.init_db()
+
+    errors = []
+    threads = [
+        threading.Thread(target=simulate_session, args=(study_store, task_store, 1000 + n, args.ops, errors))
+        for n in range(args.sessions)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    total_ops = args.sessions * args.ops
+    print(f"sessions={args.sessions} ops/session={args.ops} pool={args.pool_size}")
+    print(f"elapsed={elapsed:.2f}s  throughput={total_ops / elapsed:.0f} ops/s  errors={len(errors)}")
+    for e in sorted(set(errors))[:10]:
+        print("  ", e)
+    study.close_all()
+    tasks.close_all()
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resources import shared_resource
+from storage import get_pool
+
+# =========================
+# イベント情報の永続キャッシュ（TTL＋stale-while-revalidate）
+# =========================
+DEFAULT_TTL_SECONDS = 3 * 60 * 60  # 3時間
+MAX_PARALLEL_FETCHES = 4
+
+
+class EventCache:
+    """スクレイピング結果を SQLite に保存して使い回す。
+
+    - TTL 内ならそのまま返す
+    - TTL 切れなら古い結果をすぐ返し、裏で再取得する（同じURLの再取得は同時に1本だけ）
+    - 取得に失敗したら最後に成功した結果を返し続ける
+    """
+
+    def __init__(self, db_path, fetch, ttl=DEFAULT_TTL_SECONDS):
+        self.fetch = fetch
+        self.ttl = ttl
+        self._db = get_pool(db_path)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        with self._db.connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS event_snapshots (
+                url        TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL,
+                events     TEXT NOT NULL
+            )
+            """)
+
+    def _load(self, url):
+        with self._db.connection() as conn:
+            row = conn.execute(
+                "SELECT fetched_at, events FROM event_snapshots WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], [tuple(e) for e in json.loads(row[1])]
+
+    def _store(self, url, events):
+        with self._db.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO event_snapshots (url, fetched_at, events) VALUES (?, ?, ?)",
+                (url, time.time(), json.dumps(events, ensure_ascii=False)),
+            )
+
+    def refresh(self, url):
+        """取得して保存する。空の結果は保存しない（前回の結果を残す）"""
+        events = self.fetch(url)
+        if events:
+            self._store(url, events)
+        return events
+
+    def _refresh_in_background(self, url):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def run():
+            try:
+                self.refresh(url)
+            except Exception:
+                pass  # 失敗しても前回の結果を使い続ける
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        threading.Thread(target=run, name="event-cache-refresh", daemon=True).start()
+
+    def get(self, url):
+        """イベント一覧を返す。キャッシュが一度も無いときだけ同期的に取得する（失敗時は例外）"""
+        fetched_at, events = self._load(url)
+        if events is None:
+            return self.refresh(url)
+        if time.time() - fetched_at > self.ttl:
+            self._refresh_in_background(url)
+        return events
+
+    def get_many(self, urls):
+        """複数URLをまとめて取得する（キャッシュに無いものは並行して取りに行く）"""
+        if len(urls) <= 1:
+            return [self.get(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(len(urls), MAX_PARALLEL_FETCHES)) as pool:
+            return list(pool.map(self.get, urls))
+
+
+@shared_resource(key=lambda db_path, fetch, ttl=DEFAULT_TTL_SECONDS: db_path)
+def get_event_cache(db_path, fetch, ttl=DEFAULT_TTL_SECONDS) -> EventCache:
+    """再取得中の URL は再実行をまたいで共有する（同じ URL を二重に取りに行かない）"""
+    return EventCache(db_path, fetch, ttl=ttl)
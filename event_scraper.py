@@ -0,0 +1,104 @@
+import os
+import threading
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from profiling import count, timed
+from resources import shared_resource
+
+# =========================
+# Walkerplus のイベント一覧スクレイパー
+# =========================
+# ベンチマーク等でローカルのスタブに向けるときは WALKERPLUS_BASE_URL で上書きする
+BASE_URL = os.environ.get("WALKERPLUS_BASE_URL", "https://www.walkerplus.com")
+AREA_URL = BASE_URL + "/event_list/weekend/{area}/"
+TITLE_CLASS = "m-mainlist-item__ttl"
+REQUEST_TIMEOUT = (5, 10)  # (接続, 読み込み) 秒
+
+try:
+    import lxml  # noqa: F401
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+# イベント名の span は <a> の中にあるので、<a> 要素だけを木にする
+ONLY_LINKS = SoupStrainer("a")
+
+
+def area_url(area: str) -> str:
+    return AREA_URL.format(area=area)
+
+
+@timed("rewards.parse_events")
+def parse_events(html, base_url=BASE_URL):
+    """一覧ページから (タイトル, 絶対URL) のリストを取り出す"""
+    soup = BeautifulSoup(html, PARSER, parse_only=ONLY_LINKS)
+    events = []
+    for title_element in soup.find_all("span", class_=TITLE_CLASS):
+        # spanタグの親要素であるaタグを取得
+        link_element = title_element.find_parent("a")
+        if link_element and "href" in link_element.attrs:
+            events.append((title_element.get_text(strip=True), base_url + link_element["href"]))
+    return events
+
+
+class EventScraper:
+    """接続を使い回し、条件付きリクエスト（ETag / If-Modified-Since）で取得する。
+
+    304 が返ったときは前回の解析結果をそのまま返す。
+    """
+
+    def __init__(self, timeout=REQUEST_TIMEOUT, retries=3, pool_size=8, base_url=BASE_URL):
+        self.timeout = timeout
+        self.base_url = base_url
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._validators = {}  # url -> (ETag, Last-Modified, events)
+        self._lock = threading.Lock()
+        self.bytes_received = 0
+
+    @timed("rewards.scrape_fetch")
+    def fetch(self, url):
+        """イベント一覧を取得する（失敗時は requests の例外）"""
+        with self._lock:
+            etag, last_modified, cached = self._validators.get(url, (None, None, None))
+        headers = {}
+        if cached is not None:
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        with self._lock:
+            self.bytes_received += len(response.content)
+        if response.status_code == 304 and cached is not None:
+            count("rewards.scrape_not_modified")
+            return cached
+        response.raise_for_status()
+
+        events = parse_events(response.content, self.base_url)
+        with self._lock:
+            self._validators[url] = (
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+                events,
+            )
+        return events
+
+
+@shared_resource()
+def get_scraper() -> EventScraper:
+    """接続プールと ETag などの控えを全ページで共有する"""
+    return EventScraper()
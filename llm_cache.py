@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+import unicodedata
+
+from profiling import count
+from resources import shared_resource
+from storage import get_pool
+
+# =========================
+# LLM 応答の永続キャッシュ（tasks.db）
+# =========================
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60  # 30日
+
+
+def normalize_prompt(prompt: str) -> str:
+    # 全角/半角・改行や空白の揺れを吸収して、ほぼ同じ入力を同じキーにする
+    return " ".join(unicodedata.normalize("NFKC", prompt).split())
+
+
+def cache_key(model, temperature, prompt, variant=0) -> str:
+    raw = f"{model}\0{float(temperature):.3f}\0{normalize_prompt(prompt)}\0{variant}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """(モデル, temperature, 正規化したプロンプト) をキーに応答を保存する。
+
+    variant を変えると同じプロンプトに複数の応答を持てる（称賛メッセージのプール用）。
+    件数上限を超えると最終利用が古いものから、期限切れは書き込み時にまとめて消す。
+    """
+
+    def __init__(self, db_path, max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE_SECONDS):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._db = get_pool(db_path)
+        self._lock = threading.Lock()
+        with self._db.connection() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key          TEXT PRIMARY KEY,
+                model        TEXT NOT NULL,
+                temperature  REAL NOT NULL,
+                response     TEXT NOT NULL,
+                created_at   REAL NOT NULL,
+                last_used_at REAL NOT NULL
+            )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used_at)")
+
+    def _count(self, hit):
+        count("Split.llm_cache_hit" if hit else "Split.llm_cache_miss")
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, model, temperature, prompt, variant=0):
+        key = cache_key(model, temperature, prompt, variant)
+        now = time.time()
+        with self._db.connection() as conn:
+            row = conn.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age),
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (now, key))
+        self._count(row is not None)
+        return row[0] if row else None
+
+    def put(self, model, temperature, prompt, response, variant=0):
+        now = time.time()
+        with self._db.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, temperature, response, created_at, last_used_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(model, temperature, prompt, variant), model, float(temperature), response, now, now),
+            )
+            conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.max_age,))
+            conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+@shared_resource(key=lambda db_path, **kwargs: db_path)
+def get_llm_cache(db_path, **kwargs) -> LLMCache:
+    """ヒット数などは再実行をまたいで数える"""
+    return LLMCache(db_path, **kwargs)
@@ -0,0 +1,216 @@
+import atexit
+import functools
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# =========================
+# 再実行ごとの計測（タイミングスパン・カウンター）
+# =========================
+# LAZY_APP_PROFILING=1 のときだけ記録する。無効時は span() も timed() も
+# フラグを1回見るだけで素通りする。
+# 記録はメモリに貯めて、件数か時間で data/metrics.db にまとめて書き込む。
+# 書き込むときに METRICS_RETENTION_DAYS より古い記録を消す（LAZY_APP_METRICS_RETENTION_DAYS で変更）。
+ENABLED = os.environ.get("LAZY_APP_PROFILING", "0") not in ("", "0", "false", "False")
+METRICS_DB_PATH = os.path.join("data", "metrics.db")
+FLUSH_EVERY = 200  # 件
+FLUSH_INTERVAL = 5.0  # 秒
+METRICS_RETENTION_DAYS = float(os.environ.get("LAZY_APP_METRICS_RETENTION_DAYS", "14"))
+
+_buffer = []  # (kind, page, name, value, recorded_at)
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def set_enabled(enabled: bool):
+    global ENABLED
+    ENABLED = bool(enabled)
+
+
+def _split_name(name):
+    # "Stats.compute_metrics" -> ("Stats", "compute_metrics")
+    page, _, rest = name.partition(".")
+    return (page, rest) if rest else ("", name)
+
+
+def _record(kind, name, value):
+    global _last_flush
+    page, short = _split_name(name)
+    now = time.monotonic()
+    with _lock:
+        _buffer.append((kind, page, short, value, time.time()))
+        if len(_buffer) < FLUSH_EVERY and now - _last_flush < FLUSH_INTERVAL:
+            return
+        rows = _buffer[:]
+        _buffer.clear()
+        _last_flush = now
+    _write(rows)
+
+
+def _connect():
+    os.makedirs(os.path.dirname(METRICS_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(METRICS_DB_PATH, timeout=5)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS metrics (
+        kind        TEXT NOT NULL,   -- 'span'（ミリ秒）/ 'counter'（回数）
+        page        TEXT NOT NULL,
+        name        TEXT NOT NULL,
+        value       REAL NOT NULL,
+        recorded_at REAL NOT NULL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_metrics_recorded ON metrics(recorded_at)")
+    return conn
+
+
+def _write(rows):
+    if not rows:
+        return
+    try:
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO metrics (kind, page, name, value, recorded_at) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            # 集計は直近の期間しか見ないので、古い記録は溜めない（recorded_at の索引で消す）
+            conn.execute(
+                "DELETE FROM metrics WHERE recorded_at < ?", (time.time() - METRICS_RETENTION_DAYS * 86400,)
+            )
+        conn.close()
+    except sqlite3.Error:
+        pass  # 計測の失敗でページを止めない
+
+
+def flush():
+    global _last_flush
+    with _lock:
+        rows = _buffer[:]
+        _buffer.clear()
+        _last_flush = time.monotonic()
+    _write(rows)
+
+
+atexit.register(flush)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+
+    def stop(self):
+        if self.start is not None:
+            _record("span", self.name, (time.perf_counter() - self.start) * 1000)
+            self.start = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name):
+    """with span("Page.name"): ... で所要時間を記録する。stop() で明示的に終えてもよい"""
+    return _Span(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    """関数の所要時間を記録するデコレーター"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, n=1):
+    """カウンターを加算する"""
+    if ENABLED:
+        _record("counter", name, n)
+
+
+@contextmanager
+def _read_conn():
+    conn = _connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def span_summary(since_seconds=24 * 60 * 60, limit=20, page=None):
+    """直近の期間について、ページ・スパンごとの件数 / p50 / p95 / 最大（ミリ秒）を返す。
+
+    ページごとに p95 の遅い順で上位 limit 件ずつ（page を指定するとそのページだけ）。
+    """
+    flush()
+    with _read_conn() as conn:
+        return conn.execute(
+            """
+            WITH ranked AS (
+                SELECT page, name, value,
+                       ROW_NUMBER() OVER (PARTITION BY page, name ORDER BY value) AS rn,
+                       COUNT(*)     OVER (PARTITION BY page, name) AS n
+                FROM metrics
+                WHERE kind = 'span' AND recorded_at >= ? AND (? IS NULL OR page = ?)
+            ),
+            summary AS (
+                SELECT page, name, MAX(n) AS calls,
+                       MIN(CASE WHEN rn >= 0.50 * n THEN value END) AS p50_ms,
+                       MIN(CASE WHEN rn >= 0.95 * n THEN value END) AS p95_ms,
+                       MAX(value) AS max_ms
+                FROM ranked
+                GROUP BY page, name
+            ),
+            per_page AS (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY page ORDER BY p95_ms DESC) AS page_rank
+                FROM summary
+            )
+            SELECT page, name, calls, p50_ms, p95_ms, max_ms
+            FROM per_page
+            WHERE page_rank <= ?
+            ORDER BY p95_ms DESC
+            """,
+            (time.time() - since_seconds, page, page, limit),
+        ).fetchall()
+
+
+def counter_summary(since_seconds=24 * 60 * 60):
+    """直近の期間について、ページ・カウンターごとの合計を返す"""
+    flush()
+    with _read_conn() as conn:
+        return conn.execute(
+            """
+            SELECT page, name, SUM(value) AS total
+            FROM metrics
+            WHERE kind = 'counter' AND recorded_at >= ?
+            GROUP BY page, name
+            ORDER BY total DESC
+            """,
+            (time.time() - since_seconds,),
+        ).fetchall()
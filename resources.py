@@ -0,0 +1,28 @@
+import functools
+import threading
+
+# =========================
+# プロセスで共有するリソース（DB プール・キャッシュ・クライアントなど）
+# =========================
+
+
+def shared_resource(key=None):
+    """factory が作ったものをプロセスで使い回すデコレーター。
+
+    key(*args, **kwargs) の値ごとに、最初の呼び出しでだけ factory を実行する
+    （key を省略すると位置引数の組）。st.cache_resource と同じ考え方だが、
+    Streamlit の外（記録用のスレッドやベンチマーク）からも同じものを取れる。
+    """
+    def decorator(factory):
+        created = {}
+        lock = threading.Lock()
+
+        @functools.wraps(factory)
+        def get(*args, **kwargs):
+            k = key(*args, **kwargs) if key else args
+            with lock:
+                if k not in created:
+                    created[k] = factory(*args, **kwargs)
+                return created[k]
+        return get
+    return decorator
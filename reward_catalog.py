@@ -0,0 +1,134 @@
+import csv
+import os
+import random
+import threading
+from typing import NamedTuple
+
+from resources import shared_resource
+
+# =========================
+# ご褒美カタログ（rewards.csv の名言＋週末イベント）と重み付き抽選
+# =========================
+# レア度ごとの既定の重み。rewards.csv に weight 列があればそちらを優先する
+RARITY_WEIGHTS = {"N": 10.0, "R": 3.0, "SR": 1.0}
+QUOTE_RARITY = "R"
+EVENT_RARITY = "N"
+MAX_REDRAWS = 32  # 直近に出たものを避けるための引き直し上限
+
+
+class Reward(NamedTuple):
+    title: str
+    url: str  # 名言は ""（リンク無し）
+    rarity: str
+    weight: float
+
+    @property
+    def is_event(self):
+        return bool(self.url)
+
+
+class AliasTable:
+    """Walker/Vose のエイリアス法。構築 O(n)、1回の抽選 O(1)"""
+
+    def __init__(self, weights):
+        n = len(weights)
+        total = float(sum(weights))
+        if n == 0 or total <= 0:
+            raise ValueError("weights must contain a positive value")
+        scaled = [w * n / total for w in weights]
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, g = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            (small if scaled[g] < 1.0 else large).append(g)
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        i = int(rng.random() * len(self.prob))
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+def load_quotes(csv_path):
+    """rewards.csv を読む（rewards 列は必須、rarity / weight 列は任意）"""
+    quotes = []
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            title = (row.get("rewards") or "").strip()
+            if not title:
+                continue
+            rarity = (row.get("rarity") or QUOTE_RARITY).strip()
+            weight = row.get("weight")
+            weight = float(weight) if weight else RARITY_WEIGHTS.get(rarity, 1.0)
+            quotes.append(Reward(title, "", rarity, weight))
+    return quotes
+
+
+class RewardCatalog:
+    """名言とイベントをまとめたカタログ。
+
+    rewards.csv は mtime が変わったときだけ読み直し、イベントは内容が変わったときだけ
+    差し替える。どちらかが変わったときにエイリアステーブルを作り直す。
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._csv_mtime = None
+        self._quotes = []
+        self._events = ()
+        self._items = []
+        self._table = None
+
+    def _rebuild(self):
+        items = self._quotes + [
+            Reward(title, url, EVENT_RARITY, RARITY_WEIGHTS[EVENT_RARITY]) for title, url in self._events
+        ]
+        self._items = items
+        self._table = AliasTable([item.weight for item in items]) if items else None
+
+    def refresh(self, events=()):
+        """CSV の更新・イベントの差し替えを反映する（変化が無ければ何もしない）"""
+        try:
+            mtime = os.stat(self.csv_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        events = tuple((title, url) for title, url in events if url and url != "#")
+        with self._lock:
+            changed = False
+            if mtime != self._csv_mtime:
+                self._quotes = load_quotes(self.csv_path) if mtime is not None else []
+                self._csv_mtime = mtime
+                changed = True
+            if events and events != self._events:
+                self._events = events
+                changed = True
+            if changed:
+                self._rebuild()
+
+    def __len__(self):
+        return len(self._items)
+
+    def draw(self, recent=(), rng=random):
+        """重みに従って1つ引く。recent に含まれるタイトルはできるだけ避ける"""
+        with self._lock:
+            items, table = self._items, self._table
+        if table is None:
+            return None
+        recent = set(recent)
+        item = items[table.sample(rng)]
+        for _ in range(MAX_REDRAWS):
+            if item.title not in recent:
+                break
+            item = items[table.sample(rng)]
+        return item
+
+
+@shared_resource()
+def get_catalog(csv_path) -> RewardCatalog:
+    return RewardCatalog(csv_path)
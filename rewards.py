@@ -1,58 +1,48 @@
 import streamlit as st
+import os
 import random
-import requests
-from bs4 import BeautifulSoup
-import base64
+from collections import deque
+
+from profiling import span, timed
+from reward_catalog import get_catalog
+from static_assets import asset_url
+
+# 対象エリア（Walkerplus の ar コード）。複数指定すると並行して取得する
+EVENT_AREAS = ["ar1040"]
+EVENT_CACHE_PATH = os.path.join("data", "cache.db")
+EVENT_CACHE_TTL = 3 * 60 * 60  # 秒。これより古いと裏で取り直す
+REWARDS_CSV_PATH = "rewards.csv"
+RECENT_EXCLUDE = 5  # 直近何回分の当選を避けるか
+
+os.makedirs(os.path.dirname(EVENT_CACHE_PATH), exist_ok=True)
 
 # Webサイトから週末のイベント情報とURLを取得する関数
+@timed("rewards.get_weekend_events")
 def get_weekend_events():
-    url = "https://www.walkerplus.com/event_list/weekend/ar1040/"
-    base_url = "https://www.walkerplus.com"
+    # requests / bs4 はガチャを回したときだけ読み込む
+    import requests
+
+    from event_cache import get_event_cache
+    from event_scraper import area_url, get_scraper
+
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # 修正箇所: イベント名が含まれるspanタグをまず見つける
-        title_elements = soup.find_all('span', class_='m-mainlist-item__ttl')
-        
-        events_with_links = []
-        for title_element in title_elements:
-            # spanタグの親要素であるaタグを取得
-            link_element = title_element.find_parent('a')
-            if link_element and 'href' in link_element.attrs:
-                title = title_element.get_text(strip=True)
-                # 相対URLを絶対URLに変換
-                event_url = base_url + link_element['href']
-                events_with_links.append((title, event_url))
-        
-        return events_with_links if events_with_links else [("イベント情報が見つかりませんでした", "#")]
-        
+        # 期限切れでもキャッシュを即返し、裏で取り直す
+        cache = get_event_cache(EVENT_CACHE_PATH, get_scraper().fetch, ttl=EVENT_CACHE_TTL)
+        events = [e for area in cache.get_many([area_url(a) for a in EVENT_AREAS]) for e in area]
+        return events if events else [("イベント情報が見つかりませんでした", "#")]
+
     except requests.exceptions.RequestException as e:
         st.error(f"イベント情報の取得中にエラーが発生しました: {e}")
         return [("イベント情報の取得に失敗しました", "#")]
 
-# MP3ファイルをbase64でエンコードして、データURIとして返す関数
-def get_base64_audio_uri(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-        b64 = base64.b64encode(data).decode()
-        return f"data:audio/mp3;base64,{b64}"
-
-# ローカルの画像ファイルをBase64でエンコードして返す関数
-def get_base64_image_uri(file_path):
-    with open(file_path, "rb") as f:
-        data = f.read()
-        b64 = base64.b64encode(data).decode()
-        return f"data:image/jpeg;base64,{b64}"
-
 def set_background_image_from_local(file_path):
     """
     ローカルの画像ファイルを背景として設定します。
     ファイルパスを指定してください。
     """
     try:
-        image_uri = get_base64_image_uri(file_path)
+        # 静的URL（変更が無ければブラウザのキャッシュを再利用）
+        image_uri = asset_url(file_path, mime="image/jpeg")
         
         st.markdown(
             f"""
@@ -71,6 +61,8 @@ def set_background_image_from_local(file_path):
     except FileNotFoundError:
         st.error(f"エラー: 指定されたファイル '{file_path}' が見つかりません。")
 
+rerun_span = span("rewards.rerun")
+
 # 使用例:
 # このスクリプトと同じディレクトリに画像ファイル（例: 'background.jpg'）を配置してください
 background_image_path = "backgroundimg.jpg"
@@ -85,14 +77,22 @@ audio_file_path = "ラッパのファンファーレ.mp3"
 # ガチャを回すボタン
 if st.button("ガチャを回す！"):
     events = get_weekend_events()
-    
-    # 取得したイベントリストからランダムに1つ選択
-    result_title, result_url = random.choice(events)
-    
+
+    # 名言＋イベントのカタログから重み付きで1つ選択（直近に出たものは避ける）
+    catalog = get_catalog(REWARDS_CSV_PATH)
+    catalog.refresh(events)
+    recent = st.session_state.setdefault("recent_rewards", deque(maxlen=RECENT_EXCLUDE))
+    result = catalog.draw(recent)
+    if result is None:
+        result_title, result_url = random.choice(events)
+    else:
+        result_title, result_url = result.title, result.url
+        recent.append(result_title)
+
     st.balloons()
 
-    # 追加: base64でエンコードした効果音を再生
-    audio_uri = get_base64_audio_uri(audio_file_path)
+    # 追加: 効果音を再生（静的URL。静的配信が無効なら base64 の data URI）
+    audio_uri = asset_url(audio_file_path, mime="audio/mpeg")
     st.markdown(
         f"""
         <audio autoplay="true">
@@ -102,6 +102,11 @@ if st.button("ガチャを回す！"):
         unsafe_allow_html=True,
         )
     
-    # Markdown形式でハイパーリンクとして表示
-    st.success(f"今週末のご褒美は『{result_title}』です！")
-    st.markdown(f"[リンクはこちら]({result_url})")
\ No newline at end of file
+    if result is not None and not result.is_event:
+        st.success(f"【{result.rarity}】今日のことば：『{result_title}』")
+    else:
+        # Markdown形式でハイパーリンクとして表示
+        st.success(f"今週末のご褒美は『{result_title}』です！")
+        st.markdown(f"[リンクはこちら]({result_url})")
+
+rerun_span.stop()
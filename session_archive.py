@@ -0,0 +1,280 @@
+import importlib.util
+import io
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from profiling import timed
+from study_metrics import APP_TZ
+from study_store import DB_DIR, STATS_CACHE, _local_date_str, get_conn, read_snapshot
+
+# =========================
+# 古いセッションの月別アーカイブ（Arrow IPC ファイル）
+# =========================
+# 終了済みで ARCHIVE_HORIZON_DAYS より古いセッションを、Asia/Tokyo の月ごとに
+# data/archive/sessions-YYYY-MM.arrow へ移して sessions から消す。合計は daily_rollup に
+# 残したまま（archived_daily_rollup にも控える）なので、累計・連続日数などの指標は変わらない。
+# ファイルは非圧縮の Arrow IPC なので memory_map でそのまま（コピーせずに）読める。
+# 読む側はディレクトリではなく session_archive_files（sessions からの削除と同じ
+# トランザクションで更新する）に載っているファイルだけを見る。月を書き直すときは
+# 別名の新しいファイルを作るので、書きかけや置き換え前のファイルを読むことはない。
+ARCHIVE_DIR = os.path.join(DB_DIR, "archive")
+ARCHIVE_HORIZON_DAYS = int(os.environ.get("STUDY_ARCHIVE_HORIZON_DAYS", "365"))
+COLUMNS = ("session_id", "user_id", "started_at_utc", "finished_at_utc", "focus_seconds", "note")
+
+
+def archive_available() -> bool:
+    """pyarrow が入っていればアーカイブを使える（重いので import は使うときだけ）"""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _schema():
+    import pyarrow as pa
+
+    ts = pa.timestamp("us", tz="UTC")
+    return pa.schema([
+        ("session_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("started_at_utc", ts),
+        ("finished_at_utc", ts),
+        ("focus_seconds", pa.int64()),
+        ("note", pa.string()),
+    ])
+
+
+def _new_month_path(month: str) -> str:
+    # 書き直すたびに別名にする（一覧に載っている今のファイルは上書きしない）
+    return os.path.join(ARCHIVE_DIR, f"sessions-{month}-{uuid.uuid4().hex[:12]}.arrow")
+
+
+def archive_files() -> dict:
+    """コミット済みのアーカイブファイル（年月 YYYY-MM → パス、古い順）"""
+    with get_conn() as conn:
+        return dict(conn.execute("SELECT month, path FROM session_archive_files ORDER BY month"))
+
+
+def archived_months():
+    """アーカイブ済みの年月（YYYY-MM）を古い順に返す"""
+    return list(archive_files())
+
+
+def _months_in_range(files: dict, start_utc: datetime = None, end_utc: datetime = None) -> dict:
+    # started_at_utc が [start_utc, end_utc) に入りうる月のファイルだけを残す
+    first = start_utc.astimezone(APP_TZ).strftime("%Y-%m") if start_utc else None
+    last = (end_utc - timedelta(microseconds=1)).astimezone(APP_TZ).strftime("%Y-%m") if end_utc else None
+    return {
+        month: path for month, path in files.items()
+        if (first is None or month >= first) and (last is None or month <= last)
+    }
+
+
+def _read_file(path: str):
+    # memory_map から読んだ Table はファイルのページを直接参照する（コピーしない）
+    import pyarrow as pa
+
+    return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+
+def _to_table(rows):
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [()] * len(COLUMNS)
+    data = dict(zip(COLUMNS, columns))
+    for name in ("started_at_utc", "finished_at_utc"):
+        data[name] = [datetime.fromisoformat(v) if v else None for v in data[name]]
+    return pa.Table.from_pydict(data, schema=_schema())
+
+
+def _write_month(month: str, table):
+    import pyarrow as pa
+
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = _new_month_path(month)
+    tmp = f"{path}.tmp"
+    with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def _remove_unreferenced(files: dict):
+    # 置き換えられた古い版と、前回コミット前に落ちたときの書きかけを消す
+    referenced = {os.path.basename(path) for path in files.values()}
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    for name in os.listdir(ARCHIVE_DIR):
+        if name.startswith("sessions-") and name not in referenced:
+            os.remove(os.path.join(ARCHIVE_DIR, name))
+
+
+_archive_lock = threading.Lock()
+
+
+@timed("Stats.archive_sessions")
+def archive_sessions(horizon_days: int = ARCHIVE_HORIZON_DAYS, now: datetime = None) -> int:
+    """終了済みの古いセッションを月ごとのファイルへ移す。移した件数を返す。
+
+    対象は「今日から horizon_days 日前」を含む月より前の月（月の途中では切らない）。
+    既にある月は「今のファイル＋新しい行」を別名のファイルに書き、日次合計の控え・
+    ファイル一覧の差し替えと sessions からの削除を1トランザクションで行う。コミット前に
+    落ちても一覧は前のファイルのままなので、同じセッションが二重に見えることはない。
+    """
+    with _archive_lock:
+        return _archive_sessions(horizon_days, now)
+
+
+def _archive_sessions(horizon_days, now):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    _remove_unreferenced(archive_files())
+    now = now or datetime.now(timezone.utc)
+    cutoff = (now.astimezone(APP_TZ).date() - timedelta(days=horizon_days)).replace(day=1)
+    cutoff_utc = datetime(cutoff.year, cutoff.month, 1, tzinfo=APP_TZ).astimezone(timezone.utc).isoformat()
+
+    with get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT {', '.join(COLUMNS)} FROM sessions
+            WHERE finished_at_utc IS NOT NULL AND started_at_utc < ?
+            """,
+            (cutoff_utc,),
+        ).fetchall()
+    if not rows:
+        return 0
+
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(_local_date_str(row[2])[:7], []).append(row)
+
+    files = archive_files()
+    manifest, archived_daily = [], {}
+    for month, month_rows in sorted(by_month.items()):
+        table = _to_table(month_rows)
+        if month in files:
+            # 一覧に載っているファイルの行は sessions から消えているので、重なることはない
+            table = pa.concat_tables([_read_file(files[month]), table])
+        table = table.sort_by([("started_at_utc", "ascending"), ("session_id", "ascending")])
+        path = _write_month(month, table)
+        manifest.append((month, path, table.num_rows, pc.sum(table["focus_seconds"]).as_py() or 0))
+        for session_id, user_id, started_at_utc, _, focus_seconds, _ in month_rows:
+            key = (user_id, _local_date_str(started_at_utc))
+            secs, count = archived_daily.get(key, (0, 0))
+            archived_daily[key] = (secs + int(focus_seconds or 0), count + 1)
+
+    archived_at = now.isoformat()
+    with get_conn() as conn:
+        conn.executemany(
+            """
+            INSERT INTO archived_daily_rollup (user_id, local_date, focus_seconds, session_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, local_date) DO UPDATE SET
+                focus_seconds = focus_seconds + excluded.focus_seconds,
+                session_count = session_count + excluded.session_count
+            """,
+            [(u, d, secs, count) for (u, d), (secs, count) in archived_daily.items()],
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO session_archive_files (month, path, session_count, focus_seconds, archived_at_utc)"
+            " VALUES (?, ?, ?, ?, ?)",
+            [(month, path, n, secs, archived_at) for month, path, n, secs in manifest],
+        )
+        conn.executemany("DELETE FROM sessions WHERE session_id = ?", [(row[0],) for row in rows])
+    STATS_CACHE.invalidate()
+    return len(rows)
+
+
+def scan_archive(user_id=None, start_utc=None, end_utc=None, files=None):
+    """アーカイブを1つの Table として読む（start_utc 以上 end_utc 未満、月は古い順）。
+
+    範囲に掛からない月のファイルは開かない。files は archive_files() の結果（省略時は今の一覧）。
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    files = _months_in_range(archive_files() if files is None else files, start_utc, end_utc)
+    tables = [_read_file(path) for path in files.values()]
+    if not tables:
+        return _schema().empty_table()
+    table = pa.concat_tables(tables)
+    mask = None
+    for cond in (
+        pc.equal(table["user_id"], user_id) if user_id is not None else None,
+        pc.greater_equal(table["started_at_utc"], pa.scalar(start_utc, table["started_at_utc"].type))
+        if start_utc is not None else None,
+        pc.less(table["started_at_utc"], pa.scalar(end_utc, table["started_at_utc"].type))
+        if end_utc is not None else None,
+    ):
+        if cond is not None:
+            mask = cond if mask is None else pc.and_(mask, cond)
+    return table if mask is None else table.filter(mask)
+
+
+def _as_rows(table):
+    # sessions テーブルと同じ形（ISO 文字列の時刻）のタプルにする
+    return [
+        (r["session_id"], r["started_at_utc"].isoformat(),
+         r["finished_at_utc"].isoformat() if r["finished_at_utc"] else None, r["focus_seconds"], r["note"])
+        for r in table.to_pylist()
+    ]
+
+
+@timed("Stats.archive_page")
+def archive_page(user_id, anchor=None, direction="older", limit=20, start_utc=None, end_utc=None):
+    """アーカイブから (started_at_utc, session_id) のキーセットで最大 limit 件を返す。
+
+    older は新しい順、newer は古い順。期間と anchor に掛かる月のファイルだけを anchor 側から
+    順に開き、limit 件集まった月で止める（月と started_at_utc の順序は一致する）。
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    start = datetime.fromisoformat(start_utc) if start_utc else None
+    end = datetime.fromisoformat(end_utc) if end_utc else None
+    files = _months_in_range(archive_files(), start, end)
+    months = list(files)
+    if anchor is not None:
+        anchor_month = _local_date_str(anchor[0])[:7]
+        months = [m for m in months if (m <= anchor_month if direction == "older" else m >= anchor_month)]
+    if direction == "older":
+        months.reverse()
+
+    order = "descending" if direction == "older" else "ascending"
+    picked = []
+    for month in months:
+        table = scan_archive(user_id, start, end, files={month: files[month]})
+        if anchor is not None:
+            started = table["started_at_utc"]
+            at = pa.scalar(datetime.fromisoformat(anchor[0]), started.type)
+            cmp = pc.less if direction == "older" else pc.greater
+            table = table.filter(pc.or_(
+                cmp(started, at),
+                pc.and_(pc.equal(started, at), cmp(table["session_id"], anchor[1])),
+            ))
+        table = table.sort_by([("started_at_utc", order), ("session_id", order)]).slice(0, limit - len(picked))
+        picked += _as_rows(table)
+        if len(picked) >= limit:
+            break
+    return picked
+
+
+@timed("Stats.export_sessions")
+def export_sessions(user_id) -> bytes:
+    """アーカイブと sessions を合わせた全記録を Parquet のバイト列で返す"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # ファイル一覧と sessions を同じ時点で読む（間にアーカイブされても重複・欠落しない）
+    with read_snapshot() as conn:
+        files = archive_files()
+        live = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM sessions WHERE user_id = ? ORDER BY started_at_utc",
+            (user_id,),
+        ).fetchall()
+    table = pa.concat_tables([scan_archive(user_id, files=files), _to_table(live)])
+    buf = io.BytesIO()
+    pq.write_table(table, buf)
+    return buf.getvalue()
@@ -0,0 +1,179 @@
+import atexit
+import queue
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from profiling import count, timed
+from resources import shared_resource
+
+# =========================
+# Start.py のタイマー → study.db（sessions）への非同期記録
+# =========================
+FLUSH_INTERVAL = 1.0  # 秒。この間に来たイベントはまとめて1トランザクションで書く
+CHECKPOINT_INTERVAL = 15.0  # 秒。動作中の途中経過はこれより細かくは書かない
+EVENTS = ("start", "pause", "resume", "progress", "finish")
+
+
+class _Session:
+    __slots__ = ("session_id", "started_at", "focus_seconds", "running", "updated_at",
+                 "finished", "dirty", "checkpointed_at")
+
+    def __init__(self, started_at):
+        self.session_id = None
+        self.started_at = started_at
+        self.focus_seconds = 0
+        self.running = False
+        self.updated_at = started_at
+        self.finished = False
+        self.dirty = True
+        self.checkpointed_at = None
+
+
+class SessionLogger:
+    """タイマーのイベント（開始・一時停止・再開・進捗・終了）を描画を待たせずに記録する。
+
+    呼び出し側はキューに積むだけで、書き込みは専用スレッドが行う。FLUSH_INTERVAL の間に
+    来たイベントはセッションごとに最後の状態へまとめてから書く。動作中のセッションは
+    session_checkpoints に途中経過を残し、プロセスが落ちた場合は次の起動時に
+    最後のチェックポイントの時点で終了にする（study_store.recover_inflight_sessions）。
+    """
+
+    def __init__(self, user_id=1, flush_interval=FLUSH_INTERVAL, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.user_id = user_id
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.recovered = 0
+        self.alive = True  # 書き込みスレッドが動けなくなったら False（以降のイベントは捨てる）
+        self._queue = queue.SimpleQueue()
+        self._sessions = {}  # key -> _Session（書き込みスレッドだけが触る）
+        self._flush_requested = threading.Event()
+        threading.Thread(target=self._run, name="session-logger", daemon=True).start()
+        atexit.register(self.flush)
+
+    @staticmethod
+    def new_key() -> str:
+        """1回分のタイマーを識別するキー（DB の session_id は書き込み時に決まる）"""
+        return uuid.uuid4().hex
+
+    def log(self, event, key, focus_seconds, at=None):
+        """イベントを積む（すぐ戻る）。focus_seconds はその時点までの集中時間"""
+        if event not in EVENTS:
+            raise ValueError(f"unknown event: {event}")
+        if not self.alive:
+            count("Start.log_dropped")  # 書く人がいないので溜めない
+            return
+        self._queue.put((event, key, int(focus_seconds), at or datetime.now(timezone.utc)))
+
+    def flush(self, timeout=5.0) -> bool:
+        """積まれているイベントを書き終えるまで待つ"""
+        if not self.alive:
+            return False
+        done = threading.Event()
+        self._queue.put(("flush", done, 0, None))
+        self._flush_requested.set()
+        return done.wait(timeout)
+
+    def _run(self):
+        try:
+            # study_store（numpy などを読み込む）は描画側ではなくこのスレッドで import する
+            import study_store
+        except Exception:
+            self.alive = False
+            count("Start.log_error")
+            # 待っている flush を帰す
+            while True:
+                try:
+                    event, done, _, _ = self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                if event == "flush":
+                    done.set()
+
+        try:
+            study_store.init_db()
+            self.recovered = study_store.recover_inflight_sessions()
+        except Exception:
+            count("Start.log_error")
+        retry = False
+        while True:
+            try:
+                # 書けなかった分があるときは、イベントが来なくても FLUSH_INTERVAL 後に書き直す
+                batch = [self._queue.get(timeout=self.flush_interval if retry else None)]
+            except queue.Empty:
+                batch = []
+            # イベントごとには起きず、しばらく待ってから溜まった分をまとめて取り出す
+            if batch and batch[0][0] != "flush":
+                self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(study_store, batch)
+                retry = False
+            except Exception:
+                # 状態は self._sessions に残っているので、次のバッチで書き直す
+                count("Start.log_error")
+                retry = True
+            for event, done, _, _ in batch:
+                if event == "flush":
+                    done.set()
+
+    @timed("Start.log_write")
+    def _write(self, study_store, batch):
+        for event, key, focus_seconds, at in batch:
+            if event == "flush":
+                continue
+            s = self._sessions.get(key)
+            if s is None:
+                if event != "start":
+                    continue  # 開始を記録していないタイマー（記録オフの間に始めたもの）
+                s = self._sessions[key] = _Session(at)
+            s.focus_seconds = max(s.focus_seconds, focus_seconds)
+            s.updated_at = at
+            s.running = event in ("start", "resume", "progress")
+            s.finished = s.finished or event == "finish"
+            s.dirty = s.dirty or event != "progress"
+        # 前のバッチで書けなかったものも含めて、まだ書いていない状態を持つセッションを書く。
+        # 進捗だけのセッションは CHECKPOINT_INTERVAL ごとにしか書かない
+        due = {
+            key: s for key, s in self._sessions.items()
+            if s.session_id is None or s.finished or s.dirty
+            or (s.updated_at - s.checkpointed_at).total_seconds() >= self.checkpoint_interval
+        }
+        if not due:
+            return
+
+        inserted, finished, checkpointed = [], [], []
+        with study_store.get_conn():
+            for key, s in due.items():
+                session_id = s.session_id
+                if session_id is None:
+                    session_id = study_store.insert_session_start(self.user_id, s.started_at)
+                    inserted.append((s, session_id))
+                if s.finished:
+                    study_store.finish_session(session_id, s.updated_at, s.focus_seconds)
+                    study_store.clear_checkpoint(session_id)
+                    finished.append(key)
+                else:
+                    study_store.save_checkpoint(session_id, s.focus_seconds, s.running, s.updated_at)
+                    checkpointed.append(s)
+
+        # commit できてから反映する（失敗したら次のバッチで同じ内容を書き直す）
+        for s, session_id in inserted:
+            s.session_id = session_id
+        for key in finished:
+            del self._sessions[key]
+        for s in checkpointed:
+            s.dirty = False
+            s.checkpointed_at = s.updated_at
+        count("Start.log_batch")
+
+
+@shared_resource()
+def get_session_logger() -> SessionLogger:
+    """記録係は1つだけ（初回に前回の書きかけセッションを復旧する）"""
+    return SessionLogger()
@@ -0,0 +1,81 @@
+import base64
+import hashlib
+import mimetypes
+import os
+import shutil
+import threading
+
+import streamlit as st
+
+from profiling import timed
+
+# =========================
+# 静的アセット（背景画像・効果音など）の配信
+# =========================
+# Streamlit の静的配信（server.enableStaticServing）で app/static/ 以下を URL として配る。
+# ファイル名は「パスのハッシュ-パス＋mtime のハッシュ」なので、中身が変わらない限り URL も
+# 変わらずブラウザのキャッシュが効く。元ファイルが変わって新しい版を書いたら、同じパスの
+# 前の版（先頭が同じファイル）は消す。静的配信が無効なときだけ data URI に埋め込む。
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+STATIC_URL_PREFIX = "app/static"
+
+_urls = {}  # (絶対パス, mtime_ns) -> URL
+_lock = threading.Lock()
+
+
+def _path_key(path):
+    return hashlib.sha1(path.encode("utf-8")).hexdigest()[:12]
+
+
+def _asset_key(path, mtime_ns):
+    version = hashlib.sha1(f"{path}:{mtime_ns}".encode("utf-8")).hexdigest()[:16]
+    return f"{_path_key(path)}-{version}"
+
+
+def _remove_old_versions(path, keep):
+    # 同じ元ファイルから前に書いた版（再起動前のものも含む）を消す
+    prefix = _path_key(path) + "-"
+    for name in os.listdir(STATIC_DIR):
+        if name.startswith(prefix) and name != keep and not name.endswith(".tmp"):
+            try:
+                os.remove(os.path.join(STATIC_DIR, name))
+            except FileNotFoundError:
+                pass  # 他のセッションが先に消した
+
+
+@timed("rewards.asset_publish")
+def _publish(path, key, mime):
+    if st.get_option("server.enableStaticServing"):
+        name = key + os.path.splitext(path)[1].lower()
+        dest = os.path.join(STATIC_DIR, name)
+        if not os.path.exists(dest):
+            os.makedirs(STATIC_DIR, exist_ok=True)
+            tmp = f"{dest}.{threading.get_ident()}.tmp"
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, dest)
+            _remove_old_versions(path, name)
+        return f"{STATIC_URL_PREFIX}/{name}"
+
+    # フォールバック：data URI（エンコードはファイルが変わるまで1回だけ）
+    with open(path, "rb") as f:
+        b64 = base64.b64encode(f.read()).decode()
+    return f"data:{mime};base64,{b64}"
+
+
+def asset_url(file_path, mime=None):
+    """ローカルファイルを配信用 URL にして返す（ファイルが無ければ FileNotFoundError）"""
+    path = os.path.abspath(file_path)
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _lock:
+        url = _urls.get((path, mtime_ns))
+    if url is not None:
+        return url
+
+    mime = mime or mimetypes.guess_type(path)[0] or "application/octet-stream"
+    url = _publish(path, _asset_key(path, mtime_ns), mime)
+    with _lock:
+        # 同じファイルの古い版は捨てる
+        for old in [k for k in _urls if k[0] == path]:
+            del _urls[old]
+        _urls[(path, mtime_ns)] = url
+    return url
@@ -0,0 +1,101 @@
+import sys
+import threading
+from collections import OrderedDict
+
+from profiling import count
+from resources import shared_resource
+
+# =========================
+# Stats の読み込み・集計結果のプロセス内キャッシュ
+# =========================
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024  # 32MiB
+
+
+def _nbytes(value) -> int:
+    """おおよそのメモリ量（DataFrame / numpy 配列 / dict・list の入れ子）"""
+    if hasattr(value, "memory_usage"):  # DataFrame / Series
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(value, "nbytes"):  # numpy 配列
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class StatsCache:
+    """ユーザーごとに読み込み・集計の結果を覚えておく。
+
+    各エントリは取得時の変更トークンと一緒に持ち、トークンが変わっていれば作り直す。
+    再実行のたびに走るのはトークンを読む1クエリだけ。トークンは version(user_id) で、
+    省略時は DB 全体の PRAGMA data_version（どのテーブルへのどの書き込みでも全員分が
+    作り直しになる）。study_store はユーザーごとの変更カウンタを渡している。
+    書き込み側は invalidate で明示的に捨てる。合計が max_bytes を超えたら、
+    最後に使われたのが古いユーザーから丸ごと捨てる。
+    値は共有されるので、呼び出し側で書き換えないこと。
+    """
+
+    def __init__(self, pool, max_bytes=DEFAULT_MAX_BYTES, version=None):
+        self.max_bytes = max_bytes
+        self._pool = pool
+        self._version = version or (lambda user_id: pool.data_version())
+        self._users = OrderedDict()  # user_id -> {key: (token, value, nbytes)}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key, compute):
+        token = self._version(user_id)
+        with self._lock:
+            entry = self._users.get(user_id, {}).get(key)
+            if entry is not None and entry[0] == token:
+                self._users.move_to_end(user_id)
+                count("Stats.cache_hit")
+                return entry[1]
+
+        count("Stats.cache_miss")
+        value = compute()
+        self._store(user_id, key, token, value)
+        return value
+
+    def _store(self, user_id, key, token, value):
+        nbytes = _nbytes(value)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            entries = self._users.setdefault(user_id, {})
+            self._users.move_to_end(user_id)
+            # 古いトークンのエントリはもう使えないので一緒に捨てる
+            for stale in [k for k, (t, _, _) in entries.items() if k == key or t != token]:
+                self._bytes -= entries.pop(stale)[2]
+            entries[key] = (token, value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._users) > 1:
+                _, evicted = self._users.popitem(last=False)
+                self._bytes -= sum(e[2] for e in evicted.values())
+            # 1人分だけで超えるときは、そのユーザーの古いエントリから捨てる
+            for old in [k for k in entries if k != key]:
+                if self._bytes <= self.max_bytes:
+                    break
+                self._bytes -= entries.pop(old)[2]
+
+    def invalidate(self, user_id=None):
+        """user_id の分（None なら全員分）を捨てる"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+                self._bytes = 0
+                return
+            entries = self._users.pop(user_id, {})
+            self._bytes -= sum(e[2] for e in entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {"users": len(self._users), "bytes": self._bytes}
+
+
+@shared_resource(key=lambda pool, **kwargs: pool.path)
+def get_stats_cache(pool, **kwargs) -> StatsCache:
+    """DBファイルごとのキャッシュ（再実行をまたいで保持する）"""
+    return StatsCache(pool, **kwargs)
@@ -0,0 +1,146 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from resources import shared_resource
+
+# =========================
+# SQLite 共通アクセス層（Stats.py / Split.py 共用）
+# =========================
+# WAL で読み取りと書き込みを並行させ、ロック待ちは busy_timeout で吸収する
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-8000",  # 約8MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+DEFAULT_MAX_CONNECTIONS = 8
+DEFAULT_ACQUIRE_TIMEOUT = 30.0
+
+
+class ConnectionPool:
+    """上限付きのコネクションプール。
+
+    同じスレッドから入れ子で借りた場合は同じコネクションを返す（再入可能）。
+    一番外側のブロックを抜けるときに commit（例外時は rollback）してプールへ戻す。
+    """
+
+    def __init__(self, path, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 timeout=DEFAULT_ACQUIRE_TIMEOUT, detect_types=0):
+        self.path = path
+        self.timeout = timeout
+        self.detect_types = detect_types
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+        self._watch = None
+        self._watch_lock = threading.Lock()
+
+    def _connect(self):
+        # プール内のコネクションはスレッド間で受け渡すので check_same_thread=False
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.timeout,
+            detect_types=self.detect_types,
+            check_same_thread=False,
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(f"connection pool exhausted: {self.path}")
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 1
+            try:
+                yield conn
+                conn.commit()
+            except BaseException:
+                # commit の失敗（遅延制約・ディスクエラーなど）でも、開いたトランザクションを残して戻さない
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    self._discard(conn)
+                    conn = None
+                raise
+            finally:
+                self._local.conn = None
+                self._local.cursor = None
+                if conn is not None:
+                    self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def _discard(self, conn):
+        # rollback もできないコネクションは閉じて捨てる（次に借りるときに作り直す）
+        with self._lock:
+            if conn in self._all:
+                self._all.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def cursor(self):
+        """スレッドごとのカーソル（借りているコネクション上で使い回す）"""
+        with self.connection() as conn:
+            cur = getattr(self._local, "cursor", None)
+            if cur is None:
+                cur = self._local.cursor = conn.cursor()
+            yield cur
+
+    def data_version(self):
+        """変更検知用の値。プール内の接続も含め、他の接続が commit するたびに変わる。
+
+        書き込みをしない監視専用の接続で PRAGMA data_version を読むので、
+        どの接続からの書き込みも取りこぼさない。
+        """
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            return self._watch.execute("PRAGMA data_version").fetchone()[0]
+
+    def close_all(self):
+        with self._watch_lock:
+            if self._watch is not None:
+                self._watch.close()
+                self._watch = None
+        with self._lock:
+            conns, self._all = self._all, []
+        for conn in conns:
+            conn.close()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+
+@shared_resource(key=lambda path, **kwargs: path)
+def get_pool(path, **kwargs) -> ConnectionPool:
+    """DBファイル（パス）ごとのプール。kwargs は最初に作るときだけ使う"""
+    return ConnectionPool(path, **kwargs)
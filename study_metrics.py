@@ -0,0 +1,80 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from profiling import timed
+
+# =========================
+# 指標計算（Asia/Tokyoでの日付を基準）
+# =========================
+APP_TZ = ZoneInfo("Asia/Tokyo")
+
+EMPTY_METRICS = {
+    "total_seconds": 0,
+    "last7_seconds": 0,
+    "last30_seconds": 0,
+    "streak_days": 0,
+    "longest_streak_days": 0,
+}
+
+
+def empty_by_day():
+    return {"local_date": np.array([], dtype="datetime64[D]"), "focus_seconds": np.array([], dtype=np.int64)}
+
+
+def _window_seconds(days: np.ndarray, secs: np.ndarray, today: np.datetime64, n_days: int) -> int:
+    # days はソート済み。今日を含む直近 n_days 日を二分探索で切り出す
+    lo = np.searchsorted(days, today - np.timedelta64(n_days - 1, "D"), side="left")
+    hi = np.searchsorted(days, today, side="right")
+    return int(secs[lo:hi].sum())
+
+
+def _streak_runs(learned: np.ndarray):
+    """ソート済み・重複なしの日付序数から、連続区間の (末尾の序数, 長さ) を返す"""
+    if learned.size == 0:
+        return learned, learned
+    breaks = np.flatnonzero(np.diff(learned) != 1)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [learned.size - 1]))
+    return learned[ends], ends - starts + 1
+
+
+@timed("Stats.compute_metrics")
+def compute_metrics(by_day, today: date = None):
+    """日次集計（local_date, focus_seconds の列を持つ dict / DataFrame）から指標を計算する。
+
+    日付は datetime64[D] の序数として扱い、連続日数・期間集計はすべて
+    ベクトル演算で求める（1日ずつ遡るループはしない）。pandas は使わない。
+    """
+    days = np.asarray(by_day["local_date"], dtype="datetime64[D]")
+    if days.size == 0:
+        return {**EMPTY_METRICS, "by_day": empty_by_day()}
+    secs = np.nan_to_num(np.asarray(by_day["focus_seconds"], dtype=np.float64)).astype(np.int64)
+    order = np.argsort(days, kind="stable")
+    days, secs = days[order], secs[order]
+
+    today_d = np.datetime64(today or datetime.now(APP_TZ).date(), "D")
+
+    # 総学習時間 / 直近7日・30日（今日含む）
+    total_seconds = int(secs.sum())
+    last7_seconds = _window_seconds(days, secs, today_d, 7)
+    last30_seconds = _window_seconds(days, secs, today_d, 30)
+
+    # 連続日数：学習した日の序数を diff して連続区間に分割
+    learned = np.unique(days[secs > 0].astype(np.int64))
+    run_ends, run_lengths = _streak_runs(learned[learned <= today_d.astype(np.int64)])
+    # 連続の起点は「今日 or 昨日」。最後の区間がそこで終わっていれば現在の連続日数
+    today_ord = today_d.astype(np.int64)
+    streak = int(run_lengths[-1]) if run_ends.size and run_ends[-1] >= today_ord - 1 else 0
+    _, all_lengths = _streak_runs(learned)
+    longest = int(all_lengths.max()) if all_lengths.size else 0
+
+    return {
+        "total_seconds": total_seconds,
+        "last7_seconds": last7_seconds,
+        "last30_seconds": last30_seconds,
+        "streak_days": streak,
+        "longest_streak_days": longest,
+        "by_day": {"local_date": days, "focus_seconds": secs},
+    }
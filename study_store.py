@@ -0,0 +1,227 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from profiling import timed
+from stats_cache import get_stats_cache
+from storage import get_pool
+from study_metrics import APP_TZ
+
+# =========================
+# study.db（学習セッション：Stats.py と Start.py のタイマーが共用）
+# =========================
+DB_DIR = os.path.join(".", "data")
+DB_PATH = os.path.join(DB_DIR, "study.db")
+
+os.makedirs(DB_DIR, exist_ok=True)
+
+# =========================
+# DBユーティリティ
+# =========================
+STUDY_DB = get_pool(DB_PATH, detect_types=sqlite3.PARSE_DECLTYPES)
+
+# ユーザーごとの変更カウンタ。Stats が読むテーブル（sessions / daily_rollup）が変わると
+# そのユーザーの分だけ増える。タイマーのチェックポイントなど他の書き込みでは増えない
+USER_VERSION_SCHEMA = tuple(
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {table}_version_{event.lower()} AFTER {event} ON {table} BEGIN
+        INSERT INTO user_data_versions (user_id, version) VALUES ({row}.user_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+    END
+    """
+    for table in ("sessions", "daily_rollup")
+    for event, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old"))
+)
+
+def get_conn():
+    # プールから借りる（with を抜けると commit してプールへ返却）
+    return STUDY_DB.connection()
+
+@contextmanager
+def read_snapshot():
+    """中の読み込みをすべて同じ時点の内容で行う（sessions とアーカイブの一覧を食い違わせない）"""
+    with get_conn() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")  # WAL の読み取りトランザクション（抜けるときにプールが終わらせる）
+        yield conn
+
+def user_data_version(user_id: int):
+    """StatsCache の変更トークン（そのユーザーの sessions / daily_rollup が変わると変わる）"""
+    with get_conn() as conn:
+        row = conn.execute("SELECT version FROM user_data_versions WHERE user_id = ?", (user_id,)).fetchone()
+    return row[0] if row else 0
+
+# 変更が無い再実行では読み込み・集計をやり直さない（書き込み後は invalidate）
+STATS_CACHE = get_stats_cache(STUDY_DB, version=user_data_version)
+
+def init_db():
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id        INTEGER NOT NULL DEFAULT 1,
+            started_at_utc TEXT NOT NULL,
+            finished_at_utc TEXT,
+            focus_seconds  INTEGER NOT NULL DEFAULT 0,
+            note           TEXT
+        );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_started ON sessions(user_id, started_at_utc);")
+        # 日次集計（finish_session で同一トランザクション内に加算していく）
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_rollup (
+            user_id        INTEGER NOT NULL,
+            local_date     TEXT NOT NULL,
+            focus_seconds  INTEGER NOT NULL DEFAULT 0,
+            session_count  INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, local_date)
+        );
+        """)
+        # 計測中のセッションの途中経過（Start.py のタイマー。終了したら消す）
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS session_checkpoints (
+            session_id     INTEGER PRIMARY KEY REFERENCES sessions(session_id),
+            focus_seconds  INTEGER NOT NULL DEFAULT 0,
+            running        INTEGER NOT NULL DEFAULT 0,
+            updated_at_utc TEXT NOT NULL
+        );
+        """)
+        # アーカイブ（session_archive.py）へ移したセッションの日次合計と、月ごとのファイル
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS archived_daily_rollup (
+            user_id        INTEGER NOT NULL,
+            local_date     TEXT NOT NULL,
+            focus_seconds  INTEGER NOT NULL DEFAULT 0,
+            session_count  INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, local_date)
+        );
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS session_archive_files (
+            month           TEXT PRIMARY KEY,  -- Asia/Tokyo の年月（YYYY-MM）
+            path            TEXT NOT NULL,
+            session_count   INTEGER NOT NULL,
+            focus_seconds   INTEGER NOT NULL,
+            archived_at_utc TEXT NOT NULL
+        );
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_data_versions (
+            user_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        for statement in USER_VERSION_SCHEMA:
+            cur.execute(statement)
+        conn.commit()
+        # 初回のみ：既存セッションから日次集計をバックフィル
+        has_rollup = cur.execute("SELECT 1 FROM daily_rollup LIMIT 1").fetchone()
+        has_finished = cur.execute("SELECT 1 FROM sessions WHERE finished_at_utc IS NOT NULL LIMIT 1").fetchone()
+    if has_finished and not has_rollup:
+        rebuild_daily_rollup()
+
+def _local_date_str(started_at_utc: str) -> str:
+    return datetime.fromisoformat(started_at_utc).astimezone(APP_TZ).date().isoformat()
+
+def rebuild_daily_rollup():
+    """sessions（＋アーカイブ済みの合計）から daily_rollup を作り直す（バックフィル／不整合時の復旧用）"""
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT user_id, started_at_utc, focus_seconds FROM sessions WHERE finished_at_utc IS NOT NULL"
+        ).fetchall()
+        agg = {}
+        for user_id, started_at_utc, focus_seconds in rows:
+            key = (user_id, _local_date_str(started_at_utc))
+            secs, count = agg.get(key, (0, 0))
+            agg[key] = (secs + int(focus_seconds or 0), count + 1)
+        conn.execute("DELETE FROM daily_rollup")
+        conn.executemany(
+            "INSERT INTO daily_rollup (user_id, local_date, focus_seconds, session_count) VALUES (?, ?, ?, ?)",
+            [(u, d, secs, count) for (u, d), (secs, count) in agg.items()],
+        )
+        conn.execute("""
+        INSERT INTO daily_rollup (user_id, local_date, focus_seconds, session_count)
+        SELECT user_id, local_date, focus_seconds, session_count FROM archived_daily_rollup WHERE true
+        ON CONFLICT(user_id, local_date) DO UPDATE SET
+            focus_seconds = focus_seconds + excluded.focus_seconds,
+            session_count = session_count + excluded.session_count
+        """)
+        conn.commit()
+    STATS_CACHE.invalidate()
+
+@timed("Stats.insert_session_start")
+def insert_session_start(user_id: int, started_at_utc: datetime):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO sessions (user_id, started_at_utc) VALUES (?, ?)",
+            (user_id, started_at_utc.isoformat()),
+        )
+        session_id = cur.lastrowid
+    STATS_CACHE.invalidate(user_id)
+    return session_id
+
+@timed("Stats.finish_session")
+def finish_session(session_id: int, finished_at_utc: datetime, focus_seconds: int):
+    """セッションを終了にして日次集計へ加算する（二重に呼んでも差分だけ反映）"""
+    focus_seconds = max(0, int(focus_seconds))
+    with get_conn() as conn:
+        cur = conn.cursor()
+        row = cur.execute(
+            "SELECT user_id, started_at_utc, finished_at_utc, focus_seconds FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return
+        user_id, started_at_utc, prev_finished, prev_seconds = row
+        cur.execute(
+            "UPDATE sessions SET finished_at_utc = ?, focus_seconds = ? WHERE session_id = ?",
+            (finished_at_utc.isoformat(), focus_seconds, session_id),
+        )
+        # 日次集計へ加算（二重終了時は差分のみ反映）
+        delta_seconds = focus_seconds - (int(prev_seconds or 0) if prev_finished else 0)
+        delta_count = 0 if prev_finished else 1
+        cur.execute(
+            """
+            INSERT INTO daily_rollup (user_id, local_date, focus_seconds, session_count)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, local_date) DO UPDATE SET
+                focus_seconds = focus_seconds + excluded.focus_seconds,
+                session_count = session_count + excluded.session_count
+            """,
+            (user_id, _local_date_str(started_at_utc), delta_seconds, delta_count),
+        )
+    STATS_CACHE.invalidate(user_id)
+
+
+# =========================
+# 計測中セッションのチェックポイント（クラッシュ時の復旧用）
+# =========================
+def save_checkpoint(session_id: int, focus_seconds: int, running: bool, updated_at_utc: datetime):
+    with get_conn() as conn:
+        conn.execute(
+            """
+            INSERT INTO session_checkpoints (session_id, focus_seconds, running, updated_at_utc)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(session_id) DO UPDATE SET
+                focus_seconds = excluded.focus_seconds,
+                running = excluded.running,
+                updated_at_utc = excluded.updated_at_utc
+            """,
+            (session_id, max(0, int(focus_seconds)), int(running), updated_at_utc.isoformat()),
+        )
+
+def clear_checkpoint(session_id: int):
+    with get_conn() as conn:
+        conn.execute("DELETE FROM session_checkpoints WHERE session_id = ?", (session_id,))
+
+def recover_inflight_sessions() -> int:
+    """前のプロセスが終了できなかったセッションを、最後のチェックポイントの時点で終了にする"""
+    with get_conn() as conn:
+        rows = conn.execute("SELECT session_id, focus_seconds, updated_at_utc FROM session_checkpoints").fetchall()
+        for session_id, focus_seconds, updated_at_utc in rows:
+            finish_session(session_id, datetime.fromisoformat(updated_at_utc), focus_seconds)
+        conn.execute("DELETE FROM session_checkpoints")
+    return len(rows)
@@ -0,0 +1,83 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from profiling import span, timed
+from resources import shared_resource
+
+# =========================
+# タスク分割・称賛メッセージの生成（OpenAI）
+# =========================
+MODEL = "gpt-4"
+SPLIT_TEMPERATURE = 0.7
+PRAISE_TEMPERATURE = 0.9
+PRAISE_POOL_SIZE = 3  # タスクごとに貯めておく称賛メッセージの数
+
+# 称賛メッセージは分割の裏で並行して生成する
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="praise")
+
+
+@shared_resource()
+def get_client(api_key):
+    """OpenAI クライアント（APIキーごと。openai は初めて作るときに import する）"""
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key)
+
+
+def split_prompt(task):
+    return f"""
+あなたは優秀なタスク分割アシスタントです。
+以下の作業を、ポモドーロ（25分）単位で取り組めるように、3〜5ステップに分けてください。
+各ステップは、1ポモドーロ（25分）で完了できるように調整してください。
+やること: {task}
+"""
+
+
+def praise_prompt(task):
+    return f"""
+あなたはモチベーションを高める称賛メッセージの専門家です。
+以下の作業を終えた人に、短くて心に響く称賛メッセージを1つください。
+作業: {task}
+"""
+
+
+def stream_split(client, task):
+    """分割結果をトークンごとに yield する"""
+    stream = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": split_prompt(task)}],
+        temperature=SPLIT_TEMPERATURE,
+        stream=True,
+    )
+    with span("Split.openai_split_stream"):
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+@timed("Split.openai_praise")
+def generate_praise(client, task):
+    response = client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": praise_prompt(task)}],
+        temperature=PRAISE_TEMPERATURE,
+    )
+    return response.choices[0].message.content
+
+
+def pooled_praise(client, task, cache=None):
+    """タスクごとに最大 PRAISE_POOL_SIZE 個の称賛メッセージを貯め、その中から1つ選ぶ"""
+    if cache is None:
+        return generate_praise(client, task)
+    variant = random.randrange(PRAISE_POOL_SIZE)
+    prompt = praise_prompt(task)
+    message = cache.get(MODEL, PRAISE_TEMPERATURE, prompt, variant)
+    if message is None:
+        message = generate_praise(client, task)
+        cache.put(MODEL, PRAISE_TEMPERATURE, prompt, message, variant)
+    return message
+
+
+def submit_praise(client, task, cache=None):
+    """称賛メッセージの取得を裏で開始し、Future を返す"""
+    return _executor.submit(pooled_praise, client, task, cache)
@@ -0,0 +1,250 @@
+from profiling import timed
+from storage import get_pool
+
+# =========================
+# tasks.db（Split.py のタスク・子タスク）
+# =========================
+TASKS_DB_PATH = "tasks.db"
+TASKS_PER_PAGE = 10
+DEFAULT_ESTIMATE = "25分"
+SEARCH_LIMIT = 30
+MIN_FTS_TERM = 3  # trigram の長さ。2文字の語は索引の語彙から引く（1文字は LIKE で絞る）
+MAX_BIGRAM_TOKENS = 500  # 2文字の語から展開する trigram の上限（超えたら LIKE で絞る）
+
+# 全文検索：タスク1件につき1行（title と子タスクの content を改行でつないだもの）。
+# 日本語は分かち書きが無いので trigram（部分一致）で索引し、順位は bm25 で付ける。
+# どちらの列も末尾に改行を足して入れる（2文字の語が文末にあっても「語＋次の1文字」の
+# trigram が必ずできるので、tasks_fts_vocab から引ける）。
+# 中身はトリガーで tasks / subtasks と同期する。
+FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE tasks_fts USING fts5(title, content, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE tasks_fts_vocab USING fts5vocab(tasks_fts, 'row')",
+    """
+    CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, title, content) VALUES (new.id, new.title || char(10), char(10));
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title ON tasks BEGIN
+        UPDATE tasks_fts SET title = new.title || char(10) WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+        DELETE FROM tasks_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER subtasks_fts_insert AFTER INSERT ON subtasks BEGIN
+        UPDATE tasks_fts SET content = (
+            SELECT group_concat(content, char(10)) FROM subtasks WHERE parent_id = new.parent_id
+        ) || char(10) WHERE rowid = new.parent_id;
+    END
+    """,
+    """
+    CREATE TRIGGER subtasks_fts_update AFTER UPDATE OF content, parent_id ON subtasks BEGIN
+        UPDATE tasks_fts SET content = coalesce((
+            SELECT group_concat(content, char(10)) FROM subtasks WHERE parent_id = tasks_fts.rowid
+        ), '') || char(10) WHERE rowid IN (old.parent_id, new.parent_id);
+    END
+    """,
+    """
+    CREATE TRIGGER subtasks_fts_delete AFTER DELETE ON subtasks BEGIN
+        UPDATE tasks_fts SET content = coalesce((
+            SELECT group_concat(content, char(10)) FROM subtasks WHERE parent_id = old.parent_id
+        ), '') || char(10) WHERE rowid = old.parent_id;
+    END
+    """,
+)
+
+
+def get_db(path=TASKS_DB_PATH):
+    return get_pool(path)
+
+
+def init_db(path=TASKS_DB_PATH):
+    # テーブル作成（初回のみ）
+    with get_db(path).cursor() as cursor:
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS subtasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            parent_id INTEGER,
+            content TEXT NOT NULL,
+            estimated_time TEXT,
+            is_done BOOLEAN DEFAULT 0,
+            FOREIGN KEY (parent_id) REFERENCES tasks(id)
+        )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_subtasks_parent ON subtasks(parent_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at)")
+
+        # 全文検索の索引（初回だけ作って既存のタスクを流し込む）。
+        # 語彙テーブルが無いのは末尾の改行を足す前の索引なので、作り直す
+        has_fts = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts_vocab'").fetchone()
+        if not has_fts:
+            for name in ("tasks_fts_insert", "tasks_fts_update", "tasks_fts_delete",
+                         "subtasks_fts_insert", "subtasks_fts_update", "subtasks_fts_delete"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute("DROP TABLE IF EXISTS tasks_fts")
+            for statement in FTS_SCHEMA:
+                cursor.execute(statement)
+            cursor.execute("""
+            INSERT INTO tasks_fts (rowid, title, content)
+            SELECT t.id, t.title || char(10), coalesce((
+                SELECT group_concat(content, char(10)) FROM subtasks WHERE parent_id = t.id
+            ), '') || char(10)
+            FROM tasks AS t
+            """)
+
+
+def parse_subtasks(task, split_result):
+    # ✅ 子タスク（空行と、親タスクと同じ行は除外）
+    lines = (line.strip() for line in split_result.strip().split("\n"))
+    return [line for line in lines if line and line != task]
+
+
+@timed("Split.save_split")
+def save_split(task, split_result, path=TASKS_DB_PATH):
+    """親タスクと子タスクを1トランザクションで保存し、親タスクの id を返す"""
+    with get_db(path).cursor() as cursor:
+        cursor.execute("INSERT INTO tasks (title) VALUES (?)", (task,))
+        parent_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO subtasks (parent_id, content, estimated_time) VALUES (?, ?, ?)",
+            [(parent_id, line, DEFAULT_ESTIMATE) for line in parse_subtasks(task, split_result)],
+        )
+    return parent_id
+
+
+@timed("Split.set_subtasks_done")
+def set_subtasks_done(changes, path=TASKS_DB_PATH):
+    """[(subtask_id, is_done), ...] をまとめて1回のコミットで反映する"""
+    if not changes:
+        return
+    with get_db(path).cursor() as cursor:
+        cursor.executemany(
+            "UPDATE subtasks SET is_done = ? WHERE id = ?",
+            [(int(done), subtask_id) for subtask_id, done in changes],
+        )
+
+
+@timed("Split.load_task_page")
+def load_task_page(page: int, per_page: int = TASKS_PER_PAGE, path=TASKS_DB_PATH):
+    """表示するページのタスクと子タスクを1回のクエリで取得し、[(task_id, title, [subtask...])] で返す"""
+    with get_db(path).cursor() as cursor:
+        rows = cursor.execute(
+            """
+            SELECT t.id, t.title, s.id, s.content, s.is_done
+            FROM (
+                SELECT id, title, created_at FROM tasks
+                ORDER BY created_at DESC, id DESC
+                LIMIT ? OFFSET ?
+            ) AS t
+            LEFT JOIN subtasks AS s ON s.parent_id = t.id
+            ORDER BY t.created_at DESC, t.id DESC, s.id
+            """,
+            (per_page, page * per_page),
+        ).fetchall()
+    return _build_tree(rows)
+
+
+def _build_tree(rows):
+    # (task_id, title, subtask_id, content, is_done) の並びをタスクごとにまとめる
+    tree = []
+    for task_id, title, subtask_id, content, is_done in rows:
+        if not tree or tree[-1][0] != task_id:
+            tree.append((task_id, title, []))
+        if subtask_id is not None:
+            tree[-1][2].append((subtask_id, content, is_done))
+    return tree
+
+
+def _fts_phrase(term):
+    # 記号（* なども）が演算子として解釈されないよう "..." で囲む
+    return '"' + term.replace('"', '""') + '"'
+
+
+@timed("Split.search_tasks")
+def search_tasks(query: str, limit: int = SEARCH_LIMIT, path=TASKS_DB_PATH):
+    """タイトル・子タスクに query の語（空白区切り、すべてを含む）を含むタスクを関連度順に返す。
+
+    3文字以上の語は FTS5（trigram）の索引で探し、bm25 で並べる（タイトルの一致を重く）。
+    2文字の語は、その2文字で始まる trigram を語彙から集めて OR で探す。
+    1文字の語（と展開が多すぎる2文字の語）は、候補に LIKE をかけて絞る。
+    戻り値は load_task_page と同じ形。
+    """
+    terms = query.split()
+    if not terms:
+        return []
+
+    with get_db(path).cursor() as cursor:
+        matches, short_terms = [], []
+        for term in terms:
+            if len(term) >= MIN_FTS_TERM:
+                matches.append(_fts_phrase(term))
+                continue
+            tokens = _bigram_tokens(cursor, term) if len(term) == MIN_FTS_TERM - 1 else None
+            if tokens is None:
+                short_terms.append(term)
+            elif not tokens:
+                return []  # 索引に無い＝どのタスクにも含まれない
+            else:
+                matches.append("(" + " OR ".join(_fts_phrase(t) for t in tokens) + ")")
+        return _search(cursor, matches, short_terms, limit)
+
+
+def _bigram_tokens(cursor, term):
+    # term（2文字）で始まる trigram。改行を足して索引しているので、term を含む行には必ずある。
+    # 多すぎるときは None（OR が長くなりすぎるので LIKE に回す）
+    term = term.lower()  # trigram は大文字小文字を区別しない設定（語彙は小文字）
+    tokens = [row[0] for row in cursor.execute(
+        "SELECT term FROM tasks_fts_vocab WHERE term >= ? AND term < ? LIMIT ?",
+        (term, term + chr(0x10FFFF), MAX_BIGRAM_TOKENS + 1),
+    )]
+    return tokens if len(tokens) <= MAX_BIGRAM_TOKENS else None
+
+
+def _search(cursor, matches, short_terms, limit):
+    where, params = [], []
+    if matches:
+        where.append("tasks_fts MATCH ?")
+        params.append(" AND ".join(matches))
+    for term in short_terms:
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        where.append("(title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\')")
+        params.extend([pattern, pattern])
+    score = "bm25(tasks_fts, 2.0, 1.0)" if matches else "-rowid"
+    params.append(limit)
+
+    rows = cursor.execute(
+        f"""
+        WITH hits AS (
+            SELECT rowid AS id, {score} AS score
+            FROM tasks_fts
+            WHERE {' AND '.join(where)}
+            ORDER BY score, rowid DESC
+            LIMIT ?
+        )
+        SELECT t.id, t.title, s.id, s.content, s.is_done
+        FROM hits
+        JOIN tasks AS t ON t.id = hits.id
+        LEFT JOIN subtasks AS s ON s.parent_id = t.id
+        ORDER BY hits.score, t.id DESC, s.id
+        """,
+        params,
+    ).fetchall()
+    return _build_tree(rows)
+
+
+@timed("Split.count_tasks")
+def count_tasks(path=TASKS_DB_PATH) -> int:
+    with get_db(path).cursor() as cursor:
+        return cursor.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
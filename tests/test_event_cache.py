@@ -0,0 +1,134 @@
+"""event_cache.EventCache（TTL＋stale-while-revalidate）のテスト
+
+Walkerplus の代わりにフィクスチャページを配信するローカルの HTTP サーバーを立て、
+本物の EventScraper で取得する。
+
+    python -m pytest -q tests
+"""
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from event_cache import EventCache  # noqa: E402
+from event_scraper import EventScraper  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "walkerplus_weekend.html")
+
+
+class StandIn(http.server.BaseHTTPRequestHandler):
+    """フィクスチャを返すスタブ。status / body を差し替えて失敗や更新を再現する"""
+
+    status = 200
+    body = b""
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        self.send_response(self.status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def wait_until(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class EventCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        with open(FIXTURE, "rb") as f:
+            cls.fixture = f.read()
+        cls.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StandIn.status, StandIn.body, StandIn.hits = 200, self.fixture, 0
+        self.workdir = tempfile.mkdtemp(prefix="test_event_cache_")
+        self.url = self.base_url + "/event_list/weekend/ar0313/"
+        # リトライすると失敗のテストが遅くなるだけなので 0 回
+        scraper = EventScraper(timeout=(2, 2), retries=0, base_url=self.base_url)
+        self.cache = EventCache(os.path.join(self.workdir, "cache.db"), scraper.fetch, ttl=60)
+
+    def tearDown(self):
+        self.cache._db.close_all()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def make_stale(self):
+        with self.cache._db.connection() as conn:
+            conn.execute("UPDATE event_snapshots SET fetched_at = fetched_at - ?", (self.cache.ttl + 1,))
+
+    def wait_refreshed(self):
+        self.assertTrue(wait_until(lambda: not self.cache._refreshing), "background refresh did not finish")
+
+    def test_fresh_hit_does_not_request(self):
+        first = self.cache.get(self.url)
+        self.assertEqual(first[0], ("春のフラワーフェスタ", self.base_url + "/event/ar1040e0001/"))
+        self.assertEqual(len(first), 2)
+        self.assertEqual(StandIn.hits, 1)
+
+        self.assertEqual(self.cache.get(self.url), first)
+        self.assertEqual(StandIn.hits, 1)
+        self.assertFalse(self.cache._refreshing)
+
+    def test_stale_hit_returns_old_snapshot_and_refreshes_in_background(self):
+        old = self.cache.get(self.url)
+        self.make_stale()
+        StandIn.body = self.fixture.replace("古本市".encode(), "ナイトマーケット".encode())
+
+        self.assertEqual(self.cache.get(self.url), old)  # 待たずに古い結果
+        self.wait_refreshed()
+        self.assertEqual(StandIn.hits, 2)
+        fetched_at, events = self.cache._load(self.url)
+        self.assertEqual(events[1][0], "ナイトマーケット")
+        self.assertLess(time.time() - fetched_at, self.cache.ttl)
+        self.assertEqual(self.cache.get(self.url), events)
+        self.assertEqual(StandIn.hits, 2)
+
+    def test_failed_refresh_keeps_last_good_snapshot(self):
+        old = self.cache.get(self.url)
+        self.make_stale()
+        StandIn.status, StandIn.body = 503, b"unavailable"
+
+        self.assertEqual(self.cache.get(self.url), old)
+        self.wait_refreshed()
+        self.assertEqual(StandIn.hits, 2)
+        self.assertEqual(self.cache._load(self.url)[1], old)
+        self.assertEqual(self.cache.get(self.url), old)  # まだ古いので、また裏で取りに行く
+        self.wait_refreshed()
+        self.assertEqual(self.cache._load(self.url)[1], old)
+
+    def test_cold_cache_failure_raises(self):
+        StandIn.status, StandIn.body = 500, b"error"
+        with self.assertRaises(requests.exceptions.RequestException):
+            self.cache.get(self.url)
+        self.assertEqual(self.cache._load(self.url), (None, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""session_archive（古いセッションの月別アーカイブ）の往復テスト
+
+一時ディレクトリをカレントにしてセッションを入れ、Stats.py を AppTest で動かす。
+アーカイブの前後で、履歴を最後のページまで送った結果・書き出し・日次集計と指標が
+変わらない（重複も欠落も無い）ことを確かめる。
+
+    python -m pytest -q tests
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import study_store  # noqa: E402
+import session_archive  # noqa: E402
+
+STATS_PY = os.path.join(ROOT, "Stats.py")
+SESSIONS = 90
+
+
+@unittest.skipUnless(session_archive.archive_available(), "pyarrow is not installed")
+class SessionArchiveRoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp(prefix="test_session_archive_")
+        # study_store の DB とアーカイブは ./data の下（カレントからの相対パス）
+        os.chdir(self.workdir)
+        os.makedirs(study_store.DB_DIR)
+        study_store.init_db()
+        self.seed()
+
+    def tearDown(self):
+        study_store.STUDY_DB.close_all()
+        study_store.STATS_CACHE.invalidate()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def seed(self):
+        # 約3年分。月をまたぐ日・同じ開始時刻の2件・終了していない古い1件を含める
+        now = datetime.now(timezone.utc).replace(microsecond=0)
+        starts = [now - timedelta(days=12 * k, hours=k % 5) for k in range(1, SESSIONS)]
+        starts.append(starts[-1])
+        with study_store.get_conn():
+            for n, started in enumerate(starts):
+                session_id = study_store.insert_session_start(1, started)
+                study_store.finish_session(session_id, started + timedelta(minutes=25), 600 + n)
+            study_store.insert_session_start(1, now - timedelta(days=800))
+
+    def query(self, sql):
+        with study_store.get_conn() as conn:
+            return conn.execute(sql).fetchall()
+
+    def run_stats(self):
+        from streamlit.testing.v1 import AppTest
+
+        at = AppTest.from_file(STATS_PY, default_timeout=60)
+        at.run()
+        self.assertFalse(at.exception)
+        return at
+
+    def click(self, at, label):
+        next(b for b in at.button if b.label == label).click()
+        at.run()
+        self.assertFalse(at.exception)
+
+    def page_through(self, at):
+        # 最新ページから「古い →」を押せなくなるまで送り、表示された session_id を順に集める
+        ids = []
+        while True:
+            ids += list(at.dataframe[0].value["session_id"])
+            older = next(b for b in at.button if b.label == "古い →")
+            if older.disabled:
+                return ids
+            self.click(at, "古い →")
+
+    def metrics(self, at):
+        return [(m.label, m.value) for m in at.metric]
+
+    def exported_ids(self):
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(io.BytesIO(session_archive.export_sessions(1)))
+        return sorted(table["session_id"].to_pylist())
+
+    def test_archive_keeps_history_export_and_metrics(self):
+        all_ids = sorted(row[0] for row in self.query("SELECT session_id FROM sessions"))
+        rollup = self.query("SELECT * FROM daily_rollup ORDER BY user_id, local_date")
+        at = self.run_stats()
+        metrics = self.metrics(at)
+        history = self.page_through(at)
+        self.assertEqual(sorted(history), all_ids)
+        self.assertEqual(self.exported_ids(), all_ids)
+
+        at = self.run_stats()
+        self.click(at, f"{session_archive.ARCHIVE_HORIZON_DAYS}日より前の記録をアーカイブ")
+        archived = sum(n for (n,) in self.query("SELECT session_count FROM session_archive_files"))
+        self.assertGreater(archived, 0)
+        self.assertEqual(len(self.query("SELECT session_id FROM sessions")), len(all_ids) - archived)
+        self.assertEqual(
+            sorted(os.listdir(session_archive.ARCHIVE_DIR)),
+            sorted(os.path.basename(path) for path in session_archive.archive_files().values()),
+        )
+
+        # 履歴は同じ行が同じ順に並び、書き出しも日次集計も指標も変わらない
+        self.assertEqual(self.metrics(at), metrics)
+        self.assertEqual(self.page_through(at), history)
+        self.assertEqual(self.exported_ids(), all_ids)
+        self.assertEqual(self.query("SELECT * FROM daily_rollup ORDER BY user_id, local_date"), rollup)
+
+        # 再構築しても、アーカイブ済みの分は archived_daily_rollup から戻る
+        at = self.run_stats()
+        self.click(at, "日次集計を再構築")
+        self.assertEqual(self.query("SELECT * FROM daily_rollup ORDER BY user_id, local_date"), rollup)
+        self.assertEqual(self.metrics(at), metrics)
+
+        # もう一度アーカイブしても（移す行が無くても）何も増えない
+        self.assertEqual(session_archive.archive_sessions(), 0)
+        self.assertEqual(self.exported_ids(), all_ids)
+
+
+if __name__ == "__main__":
+    unittest.main()
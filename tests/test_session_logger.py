@@ -0,0 +1,130 @@
+"""session_logger.SessionLogger（タイマーのイベントの非同期記録）のテスト
+
+一時ディレクトリをカレントにして、その下の data/study.db へ本物の study_store で書く。
+
+    python -m pytest -q tests
+"""
+import atexit
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import study_store  # noqa: E402
+from session_logger import SessionLogger  # noqa: E402
+from study_metrics import APP_TZ  # noqa: E402
+
+STARTED = datetime(2026, 4, 1, 0, 30, tzinfo=timezone.utc)  # Asia/Tokyo では 4/1 9:30
+
+
+def wait_until(cond, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+class SessionLoggerTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.workdir = tempfile.mkdtemp(prefix="test_session_logger_")
+        # study_store の DB は ./data/study.db（カレントからの相対パス）
+        os.chdir(self.workdir)
+        os.makedirs(study_store.DB_DIR)
+        self.loggers = []
+
+    def tearDown(self):
+        for logger in self.loggers:
+            logger.flush()
+            atexit.unregister(logger.flush)
+        study_store.STUDY_DB.close_all()
+        os.chdir(self.cwd)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def new_logger(self, **kwargs):
+        logger = SessionLogger(flush_interval=0.05, **kwargs)
+        self.loggers.append(logger)
+        return logger
+
+    def query(self, sql):
+        with study_store.get_conn() as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_start_pause_resume_finish_writes_one_finished_session(self):
+        logger = self.new_logger()
+        key = logger.new_key()
+        logger.log("start", key, 0, at=STARTED)
+        logger.log("progress", key, 30, at=STARTED + timedelta(seconds=30))
+        logger.log("pause", key, 60, at=STARTED + timedelta(seconds=60))
+        self.assertTrue(logger.flush())
+        self.assertEqual(self.query("SELECT session_id, focus_seconds, running FROM session_checkpoints"),
+                         [(1, 60, 0)])
+
+        logger.log("resume", key, 60, at=STARTED + timedelta(seconds=120))
+        logger.log("finish", key, 1500, at=STARTED + timedelta(seconds=1560))
+        self.assertTrue(logger.flush())
+
+        finished_at = (STARTED + timedelta(seconds=1560)).isoformat()
+        self.assertEqual(self.query("SELECT started_at_utc, finished_at_utc, focus_seconds FROM sessions"),
+                         [(STARTED.isoformat(), finished_at, 1500)])
+        self.assertEqual(self.query("SELECT user_id, local_date, focus_seconds, session_count FROM daily_rollup"),
+                         [(1, STARTED.astimezone(APP_TZ).date().isoformat(), 1500, 1)])
+        self.assertEqual(self.query("SELECT * FROM session_checkpoints"), [])
+        self.assertEqual(logger._sessions, {})
+
+    def test_failed_batch_is_written_on_next_wake_up(self):
+        logger = self.new_logger()
+        logger.flush()  # init_db を済ませてから失敗させる
+        real_finish = study_store.finish_session
+        calls = []
+
+        def flaky_finish(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            return real_finish(*args)
+
+        with mock.patch.object(study_store, "finish_session", flaky_finish):
+            key = logger.new_key()
+            logger.log("start", key, 0, at=STARTED)
+            logger.log("finish", key, 600, at=STARTED + timedelta(seconds=600))
+            logger.flush()
+            # 新しいイベントが来なくても、FLUSH_INTERVAL 後に書き直す
+            self.assertTrue(wait_until(lambda: len(calls) >= 2), "failed batch was not retried")
+            self.assertTrue(logger.flush())
+
+        self.assertEqual(self.query("SELECT session_id, focus_seconds FROM sessions"), [(1, 600)])
+        self.assertEqual(self.query("SELECT focus_seconds, session_count FROM daily_rollup"), [(600, 1)])
+        self.assertEqual(logger._sessions, {})
+
+    def test_new_logger_finishes_checkpointed_session(self):
+        crashed = self.new_logger()
+        key = crashed.new_key()
+        checkpoint_at = STARTED + timedelta(seconds=300)
+        crashed.log("start", key, 0, at=STARTED)
+        crashed.log("progress", key, 300, at=checkpoint_at)
+        self.assertTrue(crashed.flush())
+        self.assertEqual(self.query("SELECT finished_at_utc FROM sessions"), [(None,)])
+
+        # 前のプロセスが終了を書けずに落ちたものとして、新しい記録係を立てる
+        restarted = self.new_logger()
+        self.assertTrue(restarted.flush())
+        self.assertEqual(restarted.recovered, 1)
+        self.assertEqual(self.query("SELECT finished_at_utc, focus_seconds FROM sessions"),
+                         [(checkpoint_at.isoformat(), 300)])
+        self.assertEqual(self.query("SELECT focus_seconds, session_count FROM daily_rollup"), [(300, 1)])
+        self.assertEqual(self.query("SELECT * FROM session_checkpoints"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
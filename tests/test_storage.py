@@ -0,0 +1,61 @@
+"""storage.ConnectionPool のテスト
+
+    python -m pytest -q tests
+"""
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from storage import ConnectionPool  # noqa: E402
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="test_storage_")
+        self.pool = ConnectionPool(os.path.join(self.workdir, "test.db"), max_connections=1)
+        with self.pool.connection() as conn:
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("CREATE TABLE parent (id INTEGER PRIMARY KEY)")
+            conn.execute("""
+            CREATE TABLE child (
+                id INTEGER PRIMARY KEY,
+                parent_id INTEGER REFERENCES parent(id) DEFERRABLE INITIALLY DEFERRED
+            )
+            """)
+
+    def tearDown(self):
+        self.pool.close_all()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def test_failed_commit_does_not_return_open_transaction(self):
+        # 遅延外部キーは commit の時点で失敗する
+        with self.assertRaises(sqlite3.IntegrityError):
+            with self.pool.connection() as conn:
+                conn.execute("INSERT INTO child (parent_id) VALUES (42)")
+
+        with self.pool.connection() as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM child").fetchone()[0], 0)
+            conn.execute("INSERT INTO parent (id) VALUES (1)")
+            conn.execute("INSERT INTO child (parent_id) VALUES (1)")
+        with self.pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT parent_id FROM child").fetchall(), [(1,)])
+
+    def test_exception_in_block_rolls_back(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection() as conn:
+                conn.execute("INSERT INTO parent (id) VALUES (1)")
+                raise RuntimeError("boom")
+        with self.pool.connection() as conn:
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM parent").fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()